@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -17,3 +18,9 @@ class CommentCreate(CommentBase):
 class CommentRead(CommentBase):
     id: int
     post_id: int
+
+
+class CommentQueued(BaseModel):
+    provisional_id: str
+    post_id: int
+    status: Literal["queued"] = "queued"
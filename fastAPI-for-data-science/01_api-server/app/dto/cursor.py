@@ -0,0 +1,66 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(publication_date: datetime, id: int) -> str:
+    """
+    Build an opaque keyset cursor from the last row of a page.
+
+    :param publication_date: The publication date of the last row
+    :param id: The id of the last row, used as a tie-breaker
+    :return: A url-safe cursor string
+    """
+    return _encode([publication_date.isoformat(), id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Parse a cursor produced by `encode_cursor`.
+
+    :param cursor: The cursor string received from the client
+    :return: A tuple of publication date and id
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        publication_date, id = _decode(cursor)
+        return datetime.fromisoformat(publication_date), int(id)
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
+
+
+def encode_rank_cursor(score: float, id: int) -> str:
+    """
+    Build an opaque keyset cursor from the last row of a ranked page.
+
+    :param score: The relevance score of the last row
+    :param id: The id of the last row, used as a tie-breaker
+    :return: A url-safe cursor string
+    """
+    return _encode([score, id])
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Parse a cursor produced by `encode_rank_cursor`.
+
+    :param cursor: The cursor string received from the client
+    :return: A tuple of relevance score and id
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        score, id = _decode(cursor)
+        return float(score), int(id)
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
@@ -1,10 +1,14 @@
-from typing import List
+from typing import List, Literal
+from collections.abc import Callable
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict, Field
-from fastapi import Query
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from fastapi import HTTPException, Query
 
 from .comment import CommentRead
+from .cursor import decode_cursor
+
+BULK_MAXIMUM_SIZE = 1000
 
 
 class PostBase(BaseModel):
@@ -21,23 +25,69 @@ class PostCreate(PostBase):
 
 class PostRead(PostBase):
     id: int
+    updated_at: datetime | None = None
     views: int = 0
 
     comments: List[CommentRead] = []
+    comment_count: int | None = None
 
 
 class PostUpdate(PostBase):
     title: str | None = None
     content: str | None = None
 
+    @field_validator("title", "content")
+    @classmethod
+    def not_null(cls, value: str | None) -> str:
+        # Fields may be left out of an update, but not set to null.
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class PostBulkUpdate(PostUpdate):
+    id: int
+
+
+class PostBulkDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAXIMUM_SIZE)
+
+
+class BulkItemResult(BaseModel):
+    id: int
+    status: Literal["updated", "deleted", "not_found"]
+
+
+# Only orderings backed by an index, "-" for descending.
+PostSort = Literal["publication_date", "-publication_date", "id", "-id"]
+
 
 class PostPagination:
-    def __init__(self, maximum_limit: int = 100):
+    def __init__(
+        self,
+        maximum_limit: int = 100,
+        decode: Callable[[str], tuple] = decode_cursor,
+    ):
         self.maximum_limit = maximum_limit
+        self.decode = decode
 
     async def __call__(
         self,
-        skip: int = Query(0, ge=0),
+        skip: int | None = Query(None, ge=0),
         limit: int = Query(10, ge=0),
-    ) -> tuple[int, int]:
-        return skip, min(self.maximum_limit, limit)
+        after: str | None = Query(None),
+    ) -> tuple[int | None, int, tuple | None]:
+        # `skip` stays None when not sent, so routes can tell offset clients
+        # from those starting a cursor walk.
+        if after is None:
+            return skip, min(self.maximum_limit, limit), None
+
+        if skip:
+            raise HTTPException(
+                status_code=400, detail="Use either skip or after, not both"
+            )
+
+        try:
+            return 0, min(self.maximum_limit, limit), self.decode(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,5 +1,10 @@
+from collections.abc import Callable
+from datetime import datetime
 from enum import Enum
-from pydantic import BaseModel
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class Scale(str, Enum):
@@ -8,19 +13,25 @@ class Scale(str, Enum):
     KELVIN = "K"
 
 
+# Shared by single temperatures and NumPy batches, the operations work on
+# floats and arrays alike.
+KELVIN_CONVERSIONS: dict[str, Callable] = {
+    Scale.CELSIUS: lambda value: value + 273.15,
+    Scale.FAHRENHEIT: lambda value: (value - 32) * 5 / 9 + 273.15,
+    Scale.KELVIN: lambda value: value,
+}
+
+
 class Temperature(BaseModel):
     value: float
     scale: str
 
     @property
     def value_kelvin(self) -> float:
-        if self.scale == Scale.CELSIUS:
-            return self.value + 273.15
-        elif self.scale == Scale.FAHRENHEIT:
-            return (self.value - 32) * 5 / 9 + 273.15
-        elif self.scale == Scale.KELVIN:
-            return self.value
-        return 0.0
+        convert = KELVIN_CONVERSIONS.get(self.scale)
+        if convert is None:
+            return 0.0
+        return convert(self.value)
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Temperature):
@@ -31,3 +42,51 @@ class Temperature(BaseModel):
         if not isinstance(other, Temperature):
             return NotImplemented
         return self.value_kelvin < other.value_kelvin
+
+
+class TemperatureReading(BaseModel):
+    model_config = ConfigDict(use_enum_values=True)
+
+    value: float
+    scale: Scale
+    timestamp: datetime | None = None
+
+
+class TemperatureBatch(BaseModel):
+    model_config = ConfigDict(use_enum_values=True)
+
+    values: List[float] = Field(max_length=1_000_000)
+    # Either one scale per value, or a single scale for the whole batch.
+    scales: List[Scale] | Scale
+
+    @model_validator(mode="after")
+    def check_lengths(self) -> "TemperatureBatch":
+        if isinstance(self.scales, list) and len(self.scales) != len(self.values):
+            raise ValueError("values and scales must have the same length")
+        return self
+
+    def to_kelvin(self) -> np.ndarray:
+        values = np.asarray(self.values, dtype=np.float64)
+
+        if not isinstance(self.scales, list):
+            return KELVIN_CONVERSIONS[self.scales](values)
+
+        scales = np.asarray(self.scales)
+        kelvin = np.empty_like(values)
+        for scale, convert in KELVIN_CONVERSIONS.items():
+            mask = scales == scale.value
+            kelvin[mask] = convert(values[mask])
+        return kelvin
+
+
+class TemperatureConvert(BaseModel):
+    readings: TemperatureBatch
+    compare_to: TemperatureBatch | None = None
+
+    @model_validator(mode="after")
+    def check_lengths(self) -> "TemperatureConvert":
+        if self.compare_to is not None and len(self.compare_to.values) != len(
+            self.readings.values
+        ):
+            raise ValueError("readings and compare_to must have the same length")
+        return self
@@ -0,0 +1,93 @@
+import os
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """An in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class RedisCache:
+    """A cache shared by every worker, backed by any Redis-compatible server."""
+
+    def __init__(self, url: str, ttl: float = 60.0):
+        # Optional dependency, only needed when a Redis cache is configured.
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self._client.get(key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(key, value, px=int(self.ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+PostCache = TTLCache | RedisCache
+
+POST_CACHE_URL = os.environ.get("POST_CACHE_URL", "memory://")
+POST_CACHE_TTL = float(os.environ.get("POST_CACHE_TTL", 60))
+POST_CACHE_MAXSIZE = int(os.environ.get("POST_CACHE_MAXSIZE", 1024))
+
+if POST_CACHE_URL.startswith(("redis://", "rediss://")):
+    post_cache = RedisCache(POST_CACHE_URL, ttl=POST_CACHE_TTL)
+else:
+    post_cache = TTLCache(maxsize=POST_CACHE_MAXSIZE, ttl=POST_CACHE_TTL)
+
+
+def get_post_cache() -> PostCache:
+    return post_cache
@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from collections import deque
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..dto.comment import CommentCreate
+from ..repository.post import create_queued_comments, invalidate_cached_posts
+from .cache import PostCache
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class CommentQueue:
+    """
+    Write-behind buffer for comments: requests only validate and enqueue, and
+    comments are written in micro-batches once `batch_size` are pending or
+    every `interval` seconds, whichever comes first. A batch failing
+    `max_attempts` flushes in a row is dropped so it cannot block the queue.
+    """
+
+    def __init__(
+        self, maxsize: int = 10_000, batch_size: int = 500, max_attempts: int = 5
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._pending: deque[tuple[int, CommentCreate]] = deque()
+        self._batch_ready = asyncio.Event()
+        self._failures = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.dropped = 0
+
+    def put(self, post_id: int, comment_create: CommentCreate) -> str:
+        if len(self._pending) >= self.maxsize:
+            self.rejected += 1
+            raise QueueFull()
+
+        self._pending.append((post_id, comment_create))
+        self.accepted += 1
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+        return uuid.uuid4().hex
+
+    async def flush(self, session: AsyncSession, cache: PostCache) -> int:
+        count = min(len(self._pending), self.batch_size)
+        if not count:
+            return 0
+
+        batch = [self._pending.popleft() for _ in range(count)]
+        if len(self._pending) < self.batch_size:
+            self._batch_ready.clear()
+
+        try:
+            post_ids = await create_queued_comments(session, batch)
+        except Exception:
+            self._failures += 1
+            if self._failures < self.max_attempts:
+                self._pending.extendleft(reversed(batch))
+            else:
+                logger.error(
+                    f"Dropped {count} queued comments after "
+                    f"{self._failures} failed flushes"
+                )
+                self._failures = 0
+                self.dropped += count
+            raise
+        except BaseException:
+            # Put the batch back in front for the next flush, also when the
+            # flush is cancelled on shutdown.
+            self._pending.extendleft(reversed(batch))
+            raise
+
+        self._failures = 0
+        await invalidate_cached_posts(cache, post_ids)
+        # Comments on posts deleted since they were queued are not written.
+        inserted = sum(post_id in post_ids for post_id, _ in batch)
+        self.flushed += inserted
+        self.dropped += count - inserted
+
+        return count
+
+    async def drain(self, session_maker: async_sessionmaker, cache: PostCache) -> int:
+        flushed = 0
+        async with session_maker() as session:
+            while count := await self.flush(session, cache):
+                flushed += count
+        return flushed
+
+    async def run(
+        self, session_maker: async_sessionmaker, cache: PostCache, interval: float
+    ) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._batch_ready.wait(), interval)
+            try:
+                await self.drain(session_maker, cache)
+            except Exception:
+                logger.exception("Failed to flush queued comments")
+                await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "maxsize": self.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+        }
+
+
+COMMENT_QUEUE_MAXSIZE = int(os.environ.get("COMMENT_QUEUE_MAXSIZE", 10_000))
+COMMENT_BATCH_SIZE = int(os.environ.get("COMMENT_BATCH_SIZE", 500))
+COMMENT_FLUSH_INTERVAL = float(os.environ.get("COMMENT_FLUSH_INTERVAL", 0.5))
+COMMENT_FLUSH_ATTEMPTS = int(os.environ.get("COMMENT_FLUSH_ATTEMPTS", 5))
+
+comment_queue = CommentQueue(
+    COMMENT_QUEUE_MAXSIZE, COMMENT_BATCH_SIZE, COMMENT_FLUSH_ATTEMPTS
+)
+
+
+def get_comment_queue() -> CommentQueue:
+    return comment_queue
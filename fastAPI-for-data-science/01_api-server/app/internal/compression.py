@@ -0,0 +1,212 @@
+import zlib
+
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import CompressionSettings
+
+try:
+    import brotli
+except ImportError:  # Optional, `uv add brotli` to serve br.
+    brotli = None
+
+# Already compressed or incremental formats (event streams) are left alone.
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings(settings: CompressionSettings) -> list[str]:
+    supported = {"gzip"} | ({"br"} if brotli is not None else set())
+    return [encoding for encoding in settings.encodings if encoding in supported]
+
+
+def negotiate(accept_encoding: str | None, encodings: list[str]) -> str | None:
+    """
+    Pick the first of `encodings`, in server preference order, that the
+    `Accept-Encoding` header allows. `q=0` excludes an encoding.
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class Compressor:
+    def __init__(self, encoding: str, settings: CompressionSettings):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.brotli_quality)
+            self._zlib = None
+        else:
+            # wbits 31: zlib stream with a gzip header and trailer.
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str, settings: CompressionSettings) -> bytes:
+    compressor = Compressor(encoding, settings)
+    return compressor.compress(data) + compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, whichever comes first in the
+    settings among what the client accepts. Bodies sent in one message are
+    compressed only from `minimum_size` bytes, streamed bodies always.
+    Responses that already have a `Content-Encoding` pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, settings: CompressionSettings):
+        self.app = app
+        self.settings = settings
+        self.encodings = available_encodings(settings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding"), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.settings)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, settings: CompressionSettings):
+        self._send = send
+        self.encoding = encoding
+        self.settings = settings
+        self._start: Message | None = None
+        self._compressor: Compressor | None = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Headers depend on the first body message, hold them until then.
+            self._start = message
+            return
+
+        if self._start is not None:
+            start, self._start = self._start, None
+            if message["type"] == "http.response.body":
+                await self._send_first_body(start, message)
+            else:
+                await self._send(start)
+                await self._send(message)
+            return
+
+        if self._compressor is None or message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        more_body = message.get("more_body", False)
+        data = self._compressor.compress(message.get("body", b""))
+        if not more_body:
+            data += self._compressor.finish()
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+    async def _send_first_body(self, start: Message, message: Message) -> None:
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if (
+            "content-encoding" in headers
+            or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            or (not more_body and len(body) < self.settings.minimum_size)
+        ):
+            await self._send(start)
+            await self._send(message)
+            return
+
+        self._compressor = Compressor(self.encoding, self.settings)
+        data = self._compressor.compress(body)
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            data += self._compressor.finish()
+            headers["Content-Length"] = str(len(data))
+
+        await self._send(start)
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+
+class PrecomputedResponse:
+    """
+    A static body and its compressed variants, computed once so serving it
+    only picks the bytes matching the request `Accept-Encoding`. Variants are
+    kept only when the body is worth compressing and they are smaller.
+    """
+
+    def __init__(self, content: bytes, media_type: str, settings: CompressionSettings):
+        self.media_type = media_type
+        self.variants = {None: content}
+
+        # Below `minimum_size`, as in the middleware, only identity is served.
+        if not settings.enabled or len(content) < settings.minimum_size:
+            return
+
+        for encoding in available_encodings(settings):
+            compressed = compress(content, encoding, settings)
+            if len(compressed) < len(content):
+                self.variants[encoding] = compressed
+
+    def response(self, accept_encoding: str | None) -> Response:
+        encodings = [encoding for encoding in self.variants if encoding is not None]
+        encoding = negotiate(accept_encoding, encodings)
+
+        headers = {"Vary": "Accept-Encoding"} if encodings else {}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            self.variants[encoding], media_type=self.media_type, headers=headers
+        )
+
+
+settings = CompressionSettings()
@@ -0,0 +1,51 @@
+import hashlib
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def make_etag(versions: Iterable[tuple]) -> str:
+    """
+    Build a weak ETag from the version of every row in a representation.
+
+    :param versions: Tuples of id, last update and comment count
+    :return: A weak entity tag
+    """
+    digest = hashlib.sha1(repr(list(versions)).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    # Naive datetimes are stored in local time, HTTP dates are in GMT.
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: datetime | None,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    """
+    Evaluate conditional request headers as described in RFC 9110, section 13.2.2.
+
+    :return: True if the client copy is current and a 304 should be sent
+    """
+    if if_none_match is not None:
+        # Weak comparison, the W/ prefix is ignored on both sides.
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if if_modified_since is not None and last_modified is not None:
+        # Unparseable dates are ignored, as if the header was not sent.
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # -0000 and dates without a zone, taken as GMT.
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        return modified <= since
+
+    return False
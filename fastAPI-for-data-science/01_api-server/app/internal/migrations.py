@@ -0,0 +1,70 @@
+from sqlalchemy import Connection, MetaData, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from ..models.post import search_index_ddl
+
+
+def add_missing_columns(connection: Connection, metadata: MetaData) -> None:
+    """
+    Add columns declared on the models but missing from existing tables.
+
+    `create_all` only creates missing tables, so databases created by an older
+    version of the app would otherwise never see new columns. Only additive,
+    defaulted columns are handled, anything else needs a real migration.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            definition = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(
+                text(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"
+                )
+            )
+
+
+def add_missing_indexes(connection: Connection, metadata: MetaData) -> None:
+    """
+    Create indexes declared on the models but missing from existing tables.
+
+    As for columns, `create_all` only creates the indexes of new tables. On a
+    large Postgres table prefer creating the index by hand beforehand with
+    `CREATE INDEX CONCURRENTLY`, this runs in the startup transaction and
+    blocks writes to the table while it builds. The SQLite full-text index is
+    created here too.
+    """
+    inspector = inspect(connection)
+
+    for table in metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+
+    add_missing_search_index(connection)
+
+
+def add_missing_search_index(connection: Connection) -> None:
+    """
+    Create the SQLite FTS5 search table and its triggers when they are missing.
+
+    They are only created along with the posts table, so a database created by
+    an older version gets them here, then the index is rebuilt from the posts
+    already stored.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    if inspect(connection).has_table("posts_search"):
+        return
+
+    for statement in search_index_ddl:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO posts_search(posts_search) VALUES('rebuild')"))
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..repository.post import purge_deleted_posts
+
+logger = logging.getLogger(__name__)
+
+
+class PostPurger:
+    """
+    Removes soft-deleted posts and their comments in the background, in
+    bounded batches so no single transaction holds locks for long.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self.purged = 0
+
+    async def purge(self, session_maker: async_sessionmaker) -> int:
+        purged = 0
+        async with session_maker() as session:
+            while deleted := await purge_deleted_posts(session, self.batch_size):
+                purged += deleted
+                # Let requests through between batches.
+                await asyncio.sleep(0)
+
+        self.purged += purged
+        return purged
+
+    async def run(self, session_maker: async_sessionmaker, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge(session_maker)
+            except Exception:
+                logger.exception("Failed to purge deleted posts")
+
+
+POST_PURGE_INTERVAL = float(os.environ.get("POST_PURGE_INTERVAL", 60))
+POST_PURGE_BATCH_SIZE = int(os.environ.get("POST_PURGE_BATCH_SIZE", 1000))
+
+post_purger = PostPurger(POST_PURGE_BATCH_SIZE)
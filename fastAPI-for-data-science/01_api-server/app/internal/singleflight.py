@@ -0,0 +1,68 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    load, callers arriving while it is in flight wait for and share its result.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        while (call := self._calls.get(key)) is not None:
+            try:
+                result = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # The leader was cancelled, e.g. its client went away: take
+                # over with our own load instead of failing as well.
+                if not call.cancelled():
+                    raise
+                continue
+            except Exception:
+                self.coalesced += 1
+                raise
+
+            self.coalesced += 1
+            return result
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.leaders += 1
+
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as error:
+            call.set_exception(error)
+            # Followers are optional, mark the exception as retrieved.
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+post_reads = SingleFlight()
+
+
+def get_post_reads() -> SingleFlight:
+    return post_reads
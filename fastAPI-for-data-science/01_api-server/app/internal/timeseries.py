@@ -0,0 +1,152 @@
+import math
+from collections.abc import Sequence
+from datetime import datetime
+
+import numpy as np
+from pydantic import ValidationError
+
+from ..dto.temperature import TemperatureBatch, TemperatureReading
+
+# Longest line accepted, in bytes. A reading is well under 200.
+MAX_LINE_SIZE = 4096
+
+
+class LineTooLong(Exception):
+    pass
+
+
+class WindowAggregator:
+    """
+    Min, max and mean of consecutive windows of `window` readings. Only the
+    running count, sum and extremes of the open window are kept.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.index = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.start: datetime | None = None
+        self.end: datetime | None = None
+
+    def add(self, kelvin: np.ndarray, timestamps: Sequence[datetime | None]) -> list:
+        closed = []
+        offset = 0
+
+        # A batch may close several windows and start the next one.
+        while offset < len(kelvin):
+            take = min(self.window - self.count, len(kelvin) - offset)
+            values = kelvin[offset : offset + take]
+
+            self.count += take
+            self.total += float(values.sum())
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            if self.start is None:
+                self.start = timestamps[offset]
+            self.end = timestamps[offset + take - 1]
+
+            offset += take
+            if self.count == self.window:
+                closed.append(self.close())
+
+        return closed
+
+    def close(self) -> dict | None:
+        if not self.count:
+            return None
+
+        aggregate = {
+            "window": self.index,
+            "count": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.total / self.count,
+            "start": self.start,
+            "end": self.end,
+        }
+        self.index += 1
+        self._reset()
+
+        return aggregate
+
+
+class TemperatureStream:
+    """
+    Incremental parser for NDJSON temperature readings fed in arbitrary
+    chunks. Complete lines are buffered up to `batch_size`, then validated,
+    converted to Kelvin and folded into the window aggregates in one batch.
+    Lines that are not valid readings are counted and skipped, lines longer
+    than `max_line_size` raise `LineTooLong` so the pending line stays bounded.
+    """
+
+    def __init__(
+        self, window: int, batch_size: int, max_line_size: int = MAX_LINE_SIZE
+    ):
+        self.batch_size = batch_size
+        self.max_line_size = max_line_size
+        self.aggregator = WindowAggregator(window)
+        self.readings = 0
+        self.rejected = 0
+        self._tail = b""
+        self._lines: list[bytes] = []
+
+    def feed(self, chunk: bytes) -> list:
+        *lines, self._tail = (self._tail + chunk).split(b"\n")
+        if len(self._tail) > self.max_line_size:
+            raise LineTooLong()
+
+        closed = []
+        for line in lines:
+            if len(line) > self.max_line_size:
+                raise LineTooLong()
+            if line.strip():
+                self._lines.append(line)
+            if len(self._lines) == self.batch_size:
+                closed += self._process()
+
+        return closed
+
+    def close(self) -> list:
+        # The last line does not need a trailing newline.
+        closed = self.feed(b"\n") + self._process()
+
+        last = self.aggregator.close()
+        return closed + [last] if last is not None else closed
+
+    def summary(self) -> dict:
+        return {
+            "readings": self.readings,
+            "rejected": self.rejected,
+            "windows": self.aggregator.index,
+        }
+
+    def _process(self) -> list:
+        lines, self._lines = self._lines, []
+        if not lines:
+            return []
+
+        readings = []
+        for line in lines:
+            try:
+                readings.append(TemperatureReading.model_validate_json(line))
+            except ValidationError:
+                pass
+
+        self.rejected += len(lines) - len(readings)
+        if not readings:
+            return []
+
+        self.readings += len(readings)
+        batch = TemperatureBatch.model_construct(
+            values=[reading.value for reading in readings],
+            scales=[reading.scale for reading in readings],
+        )
+        return self.aggregator.add(
+            batch.to_kelvin(), [reading.timestamp for reading in readings]
+        )
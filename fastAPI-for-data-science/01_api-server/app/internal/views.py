@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..repository.post import add_post_views
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Buffers post views in memory so reads never write, and persists them in a
+    single batched UPDATE on `flush`.
+    """
+
+    def __init__(self):
+        self._pending: Counter[int] = Counter()
+
+    def record(self, post_id: int) -> None:
+        self._pending[post_id] += 1
+
+    def pending(self, post_id: int) -> int:
+        return self._pending[post_id]
+
+    async def flush(self, session: AsyncSession) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, Counter()
+        try:
+            await add_post_views(session, pending)
+        except BaseException:
+            # Keep the views for the next flush rather than losing them, also
+            # when the flush is cancelled on shutdown.
+            self._pending.update(pending)
+            raise
+
+        return pending.total()
+
+    async def run(self, session_maker: async_sessionmaker, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_maker() as session:
+                    await self.flush(session)
+            except Exception:
+                logger.exception("Failed to flush post views")
+
+
+VIEW_FLUSH_INTERVAL = float(os.environ.get("VIEW_FLUSH_INTERVAL", 5))
+
+view_counter = ViewCounter()
+
+
+def get_view_counter() -> ViewCounter:
+    return view_counter
@@ -1,7 +1,13 @@
+import asyncio
 import contextlib
 
-from .routers import temparature, http, post
-from .internal.database import create_all_tables, seed_posts
+from .routers import temparature, http, post, diagnostics
+from .internal.cache import post_cache
+from .internal.compression import CompressionMiddleware, settings as compression
+from .internal.comment_queue import COMMENT_FLUSH_INTERVAL, comment_queue
+from .internal.database import async_session_maker, create_all_tables, seed_posts
+from .internal.purge import POST_PURGE_INTERVAL, post_purger
+from .internal.views import VIEW_FLUSH_INTERVAL, view_counter
 from fastapi import FastAPI
 
 
@@ -11,12 +17,40 @@ async def lifespan(app: FastAPI):
     await create_all_tables()
     await seed_posts()
 
+    view_flusher = asyncio.create_task(
+        view_counter.run(async_session_maker, VIEW_FLUSH_INTERVAL)
+    )
+
+    comment_flusher = asyncio.create_task(
+        comment_queue.run(async_session_maker, post_cache, COMMENT_FLUSH_INTERVAL)
+    )
+
+    purger = asyncio.create_task(
+        post_purger.run(async_session_maker, POST_PURGE_INTERVAL)
+    )
+
     yield
 
+    for task in (view_flusher, comment_flusher, purger):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    # Write the comments accepted before shutdown.
+    await comment_queue.drain(async_session_maker, post_cache)
+
+    # Persist whatever was buffered since the last periodic flush.
+    async with async_session_maker() as session:
+        await view_counter.flush(session)
+
 
 app = FastAPI(lifespan=lifespan)
 
+if compression.enabled:
+    app.add_middleware(CompressionMiddleware, settings=compression)
+
 app.include_router(temparature.router)
 app.include_router(http.router)
 
 app.include_router(post.router)
+app.include_router(diagnostics.router)
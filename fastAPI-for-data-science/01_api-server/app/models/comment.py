@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -8,6 +8,16 @@ from .base import Base
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Backs loading the comments of posts and paging through them in
+        # (publication_date, id) order.
+        Index(
+            "ix_comments_post_id_publication_date_id",
+            "post_id",
+            "publication_date",
+            "id",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"), nullable=False)
@@ -1,8 +1,26 @@
 from typing import List
 from datetime import datetime
 
-from sqlalchemy import DateTime, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    DDL,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.orm import (
+    Mapped,
+    ORMExecuteState,
+    Session,
+    mapped_column,
+    query_expression,
+    relationship,
+    with_loader_criteria,
+)
 
 from .base import Base
 from .comment import Comment
@@ -10,6 +28,17 @@ from .comment import Comment
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Backs keyset pagination on (publication_date, id).
+        Index("ix_posts_publication_date_id", "publication_date", "id"),
+        # Lets the purge find tombstones without scanning live posts.
+        Index(
+            "ix_posts_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer,
@@ -29,5 +58,78 @@ class Post(Base):
         Text,
         nullable=False,
     )
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        onupdate=datetime.now,
+    )
+    views: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+    # Set by deletes, the row and its comments are removed later by the purge.
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime)
 
     comments: Mapped[List[Comment]] = relationship("Comment", cascade="all, delete")
+
+    # Only populated by queries that ask for it with `with_expression`.
+    comment_count: Mapped[int | None] = query_expression()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_deleted_posts(execute_state: ORMExecuteState) -> None:
+    # Soft-deleted posts are left out of every ORM SELECT, unless the statement
+    # opts in with `execution_options(include_deleted=True)`.
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                Post, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+            )
+        )
+
+
+# Full-text search document over title and content. On Postgres it is backed by
+# a GIN expression index, queries must use this exact expression to hit it.
+search_document = func.to_tsvector(
+    text("'english'"),
+    Post.title.concat(text("' '")).concat(Post.content),
+)
+Index("ix_posts_search", search_document, postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
+
+# On SQLite the same role is played by an FTS5 inverted index, kept in sync
+# with the posts table by triggers.
+search_index_ddl = (
+    "CREATE VIRTUAL TABLE posts_search USING fts5("
+    "title, content, content='posts', content_rowid='id')",
+    "CREATE TRIGGER posts_search_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_search(rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER posts_search_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_search(posts_search, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER posts_search_update AFTER UPDATE OF title, content ON posts "
+    "BEGIN "
+    "INSERT INTO posts_search(posts_search, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO posts_search(rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+)
+for statement in search_index_ddl:
+    event.listen(
+        Post.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+
+event.listen(
+    Post.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS posts_search").execute_if(dialect="sqlite"),
+)
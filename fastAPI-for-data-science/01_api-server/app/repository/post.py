@@ -1,35 +1,438 @@
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import re
+from collections.abc import AsyncIterator, Iterable, Mapping
+from datetime import datetime
+
+from sqlalchemy import (
+    Select,
+    and_,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.orm import aliased, lazyload, selectinload, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..dto.post import PostCreate, PostUpdate
+from ..dto.post import PostBulkUpdate, PostCreate, PostRead, PostUpdate
 from ..dto.comment import CommentCreate
-from ..models.post import Post
+from ..internal.cache import PostCache
+from ..internal.singleflight import SingleFlight
+from ..models.post import Post, search_document
 from ..models.comment import Comment
 
 
-async def get_post_by_id(session: AsyncSession, id: int) -> Post | None:
-    result = await session.execute(
-        select(Post).where(Post.id == id).options(selectinload(Post.comments))
+def _select_posts(comments_limit: int | None) -> Select:
+    if comments_limit is None:
+        return select(Post).options(selectinload(Post.comments))
+
+    # Only the comment count is loaded with the posts, the first comments are
+    # attached afterwards by `_load_first_comments`.
+    comment_count = (
+        select(func.count(Comment.id))
+        .where(Comment.post_id == Post.id)
+        .scalar_subquery()
     )
-    return result.scalar_one_or_none()
+    return (
+        select(Post)
+        .options(
+            lazyload(Post.comments),
+            with_expression(Post.comment_count, comment_count),
+        )
+        .execution_options(populate_existing=True)
+    )
+
+
+async def _load_first_comments(
+    session: AsyncSession,
+    posts: list[Post],
+    comments_limit: int | None,
+) -> None:
+    if comments_limit is None:
+        return
+
+    comments_by_post = {post.id: [] for post in posts}
+
+    if comments_limit and posts:
+        # Rank comments within each post and keep the first N, in one query
+        # for the whole page of posts.
+        position = (
+            func.row_number()
+            .over(
+                partition_by=Comment.post_id,
+                order_by=(Comment.publication_date, Comment.id),
+            )
+            .label("position")
+        )
+        ranked = (
+            select(Comment, position)
+            .where(Comment.post_id.in_(comments_by_post))
+            .subquery()
+        )
+        ranked_comment = aliased(Comment, ranked)
+
+        result = await session.execute(
+            select(ranked_comment)
+            .where(ranked.c.position <= comments_limit)
+            .order_by(ranked.c.post_id, ranked.c.position)
+        )
+        for comment in result.scalars():
+            comments_by_post[comment.post_id].append(comment)
+
+    for post in posts:
+        set_committed_value(post, "comments", comments_by_post[post.id])
 
 
-async def list_posts_all(session: AsyncSession) -> list[Post]:
+async def post_exists(session: AsyncSession, id: int) -> bool:
+    result = await session.execute(select(Post.id).where(Post.id == id))
+    return result.scalar_one_or_none() is not None
+
+
+async def get_post_version(
+    session: AsyncSession,
+    id: int,
+) -> tuple[int, datetime, int] | None:
+    # Just enough to answer a conditional GET, without loading comments.
+    comment_count = (
+        select(func.count(Comment.id)).where(Comment.post_id == id).scalar_subquery()
+    )
     result = await session.execute(
-        select(Post).order_by(Post.id).options(selectinload(Post.comments))
+        select(
+            Post.id,
+            func.coalesce(Post.updated_at, Post.publication_date),
+            comment_count,
+        ).where(Post.id == id)
     )
-    return result.scalars().all()
+    return result.one_or_none()
+
+
+async def get_post_by_id(
+    session: AsyncSession,
+    id: int,
+    comments_limit: int | None = None,
+) -> Post | None:
+    result = await session.execute(_select_posts(comments_limit).where(Post.id == id))
+    post = result.scalar_one_or_none()
+
+    if post is not None:
+        await _load_first_comments(session, [post], comments_limit)
+
+    return post
+
+
+async def get_post_read_coalesced(
+    session: AsyncSession,
+    flight: SingleFlight,
+    id: int,
+    comments_limit: int | None = None,
+) -> PostRead | None:
+    # Concurrent reads of the same post share the query of the first one.
+    # The result is shared as a PostRead, ORM objects belong to one session.
+    async def load() -> PostRead | None:
+        post = await get_post_by_id(session, id, comments_limit)
+        return None if post is None else PostRead.model_validate(post)
+
+    return await flight.do(("post", id, comments_limit), load)
+
+
+async def get_post_read_cached(
+    session: AsyncSession,
+    cache: PostCache,
+    id: int,
+    flight: SingleFlight | None = None,
+) -> PostRead | None:
+    # Read-through: serve the serialized post from the cache, fall back to
+    # the database on a miss and remember the result.
+    cached = await cache.get(f"post:{id}")
+    if cached is not None:
+        return PostRead.model_validate_json(cached)
+
+    if flight is not None:
+        post_read = await get_post_read_coalesced(session, flight, id)
+    else:
+        post = await get_post_by_id(session, id)
+        post_read = None if post is None else PostRead.model_validate(post)
+
+    if post_read is None:
+        return None
+
+    await cache.set(f"post:{id}", post_read.model_dump_json().encode())
+
+    return post_read
+
+
+async def invalidate_cached_posts(
+    cache: PostCache,
+    post_ids: Iterable[int],
+) -> None:
+    for post_id in post_ids:
+        await cache.delete(f"post:{post_id}")
+
+
+# Orderings offered to clients, each one backed by an index: the primary key
+# and ix_posts_publication_date_id, read backwards for descending orders.
+POST_SORT_KEYS = {
+    "id": (Post.id,),
+    "publication_date": (Post.publication_date, Post.id),
+}
+
+
+def _sort_posts(
+    statement: Select,
+    sort: str,
+    after: tuple[datetime, int] | None = None,
+) -> Select:
+    descending = sort.startswith("-")
+    keys = POST_SORT_KEYS[sort.removeprefix("-")]
+    statement = statement.order_by(*(key.desc() if descending else key for key in keys))
+
+    # Seek past the last row of the previous page instead of scanning and
+    # discarding `skip` rows, so every page costs the same. Cursors hold
+    # (publication_date, id), sorting by id only needs the id.
+    if after is not None:
+        position, last = tuple_(*keys), tuple_(*after[-len(keys) :])
+        statement = statement.where(position < last if descending else position > last)
+
+    return statement
+
+
+async def list_posts_all(
+    session: AsyncSession,
+    comments_limit: int | None = None,
+    sort: str = "id",
+) -> list[Post]:
+    result = await session.execute(_sort_posts(_select_posts(comments_limit), sort))
+    posts = result.scalars().all()
+    await _load_first_comments(session, posts, comments_limit)
+
+    return posts
+
+
+async def stream_posts_all(
+    session: AsyncSession,
+    batch_size: int = 500,
+) -> AsyncIterator[Post]:
+    # A server-side cursor fetches `batch_size` rows at a time, and comments are
+    # selectin-loaded per batch, so memory stays flat regardless of table size.
+    result = await session.stream(
+        select(Post)
+        .order_by(Post.id)
+        .options(selectinload(Post.comments))
+        .execution_options(yield_per=batch_size)
+    )
+    async for post in result.scalars():
+        yield post
 
 
 async def list_posts_paginated(
     session: AsyncSession,
     skip: int,
     limit: int,
+    comments_limit: int | None = None,
+    sort: str = "publication_date",
 ) -> list[Post]:
     result = await session.execute(
-        select(Post).order_by(Post.id).offset(skip).limit(limit)
+        _sort_posts(_select_posts(comments_limit), sort).offset(skip).limit(limit)
+    )
+    posts = result.scalars().all()
+    await _load_first_comments(session, posts, comments_limit)
+
+    return posts
+
+
+async def list_posts_after(
+    session: AsyncSession,
+    after: tuple[datetime, int] | None,
+    limit: int,
+    comments_limit: int | None = None,
+    sort: str = "publication_date",
+) -> list[Post]:
+    statement = _sort_posts(_select_posts(comments_limit), sort, after).limit(limit)
+
+    result = await session.execute(statement)
+    posts = result.scalars().all()
+    await _load_first_comments(session, posts, comments_limit)
+
+    return posts
+
+
+# Columns of PostRead and CommentRead, for the fast path that skips the ORM.
+POST_COLUMNS = (
+    Post.title,
+    Post.content,
+    Post.publication_date,
+    Post.id,
+    Post.updated_at,
+    Post.views,
+)
+COMMENT_COLUMNS = (
+    Comment.publication_date,
+    Comment.content,
+    Comment.id,
+    Comment.post_id,
+)
+
+
+async def _post_rows(
+    session: AsyncSession,
+    statement: Select,
+    comments_limit: int | None,
+) -> list[dict]:
+    result = await session.execute(statement)
+    posts = [dict(row) for row in result.mappings()]
+    comments_by_post = {post["id"]: [] for post in posts}
+
+    if posts and comments_limit != 0:
+        comments = select(*COMMENT_COLUMNS).where(Comment.post_id.in_(comments_by_post))
+
+        if comments_limit is None:
+            comments = comments.order_by(
+                Comment.post_id, Comment.publication_date, Comment.id
+            )
+        else:
+            position = func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=(Comment.publication_date, Comment.id),
+            )
+            ranked = comments.add_columns(position.label("position")).subquery()
+            comments = (
+                select(*(ranked.c[column.key] for column in COMMENT_COLUMNS))
+                .where(ranked.c.position <= comments_limit)
+                .order_by(ranked.c.post_id, ranked.c.position)
+            )
+
+        result = await session.execute(comments)
+        for comment in result.mappings():
+            comments_by_post[comment["post_id"]].append(dict(comment))
+
+    counts = {}
+    if posts and comments_limit is not None:
+        result = await session.execute(
+            select(Comment.post_id, func.count(Comment.id))
+            .where(Comment.post_id.in_(comments_by_post))
+            .group_by(Comment.post_id)
+        )
+        counts = dict(result.all())
+
+    for post in posts:
+        post["comments"] = comments_by_post[post["id"]]
+        post["comment_count"] = (
+            None if comments_limit is None else counts.get(post["id"], 0)
+        )
+
+    return posts
+
+
+async def list_post_rows_all(
+    session: AsyncSession,
+    comments_limit: int | None = None,
+    sort: str = "id",
+) -> list[dict]:
+    return await _post_rows(
+        session, _sort_posts(select(*POST_COLUMNS), sort), comments_limit
+    )
+
+
+async def list_post_rows_paginated(
+    session: AsyncSession,
+    skip: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    comments_limit: int | None = None,
+    sort: str = "publication_date",
+) -> list[dict]:
+    statement = (
+        _sort_posts(select(*POST_COLUMNS), sort, after).offset(skip).limit(limit)
     )
+
+    return await _post_rows(session, statement, comments_limit)
+
+
+def _rank_posts(dialect: str, query: str) -> Select:
+    if dialect == "postgresql":
+        tsquery = func.plainto_tsquery(text("'english'"), query)
+        return select(
+            Post.id.label("id"),
+            func.ts_rank(search_document, tsquery).label("score"),
+        ).where(search_document.bool_op("@@")(tsquery))
+
+    # FTS5 query syntax is rich, so quote every word and AND them together the
+    # way plainto_tsquery does. bm25() is lower for better matches.
+    posts_search = table("posts_search", column("rowid"))
+    match = " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+    return (
+        select(
+            posts_search.c.rowid.label("id"),
+            (-func.bm25(literal_column("posts_search"))).label("score"),
+        )
+        .select_from(posts_search)
+        .where(literal_column("posts_search").op("MATCH")(match))
+    )
+
+
+async def search_posts(
+    session: AsyncSession,
+    query: str,
+    skip: int,
+    limit: int,
+    after: tuple[float, int] | None = None,
+    comments_limit: int | None = None,
+) -> list[tuple[Post, float]]:
+    if not re.search(r"\w", query):
+        return []
+
+    ranked = _rank_posts(session.get_bind().dialect.name, query).subquery()
+    statement = (
+        _select_posts(comments_limit)
+        .add_columns(ranked.c.score)
+        .join(ranked, ranked.c.id == Post.id)
+        .order_by(ranked.c.score.desc(), Post.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+    if after is not None:
+        score, id = after
+        statement = statement.where(
+            or_(ranked.c.score < score, and_(ranked.c.score == score, Post.id > id))
+        )
+
+    result = await session.execute(statement)
+    rows = result.all()
+    await _load_first_comments(session, [post for post, _ in rows], comments_limit)
+
+    return rows
+
+
+async def list_comments_paginated(
+    session: AsyncSession,
+    post_id: int,
+    skip: int,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+) -> list[Comment]:
+    statement = (
+        select(Comment)
+        .where(Comment.post_id == post_id)
+        .order_by(Comment.publication_date, Comment.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+    if after is not None:
+        statement = statement.where(
+            tuple_(Comment.publication_date, Comment.id) > tuple_(*after)
+        )
+
+    result = await session.execute(statement)
     return result.scalars().all()
 
 
@@ -57,7 +460,7 @@ async def update_post(
     if post is None:
         return None
 
-    for field, value in post_update.model_dump().items():
+    for field, value in post_update.model_dump(exclude_unset=True).items():
         setattr(post, field, value)
 
     await session.commit()
@@ -70,25 +473,205 @@ async def delete_post(
     session: AsyncSession,
     post_id: int,
 ) -> bool:
-    result = await session.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
+    # Only a tombstone is written, comments are removed later by the purge.
+    result = await session.execute(
+        update(Post)
+        .where(Post.id == post_id, Post.deleted_at.is_(None))
+        .values(deleted_at=datetime.now(), updated_at=Post.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
 
-    if post is None:
-        return False
+    return result.rowcount == 1
 
-    await session.delete(post)
-    await session.commit()
 
-    return True
+async def _touch_post(session: AsyncSession, post_id: int) -> None:
+    # New comments change the post representation, so they bump its version.
+    await session.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def create_comment(
     session: AsyncSession, comment_create: CommentCreate, post_id: int
-) -> Comment:
+) -> Comment | None:
+    if not await post_exists(session, post_id):
+        return None
+
     comment = Comment(**comment_create.model_dump(), post_id=post_id)
 
     session.add(comment)
+    await _touch_post(session, post_id)
     await session.commit()
     await session.refresh(comment)
 
     return comment
+
+
+async def create_posts_bulk(
+    session: AsyncSession,
+    posts_create: list[PostCreate],
+) -> list[Post]:
+    # One multi-row INSERT ... RETURNING in a single transaction, rows come
+    # back in the same order as the request.
+    result = await session.scalars(
+        insert(Post).returning(Post, sort_by_parameter_order=True),
+        [post_create.model_dump() for post_create in posts_create],
+    )
+    posts = result.all()
+    await session.commit()
+
+    # Freshly inserted posts have no comments, spare the extra SELECT.
+    for post in posts:
+        set_committed_value(post, "comments", [])
+
+    return posts
+
+
+async def update_posts_bulk(
+    session: AsyncSession,
+    posts_update: list[PostBulkUpdate],
+) -> set[int]:
+    ids = [post_update.id for post_update in posts_update]
+    result = await session.execute(select(Post.id).where(Post.id.in_(ids)))
+    existing = set(result.scalars().all())
+
+    values = [
+        post_update.model_dump(exclude_unset=True)
+        for post_update in posts_update
+        if post_update.id in existing and post_update.model_fields_set - {"id"}
+    ]
+    if values:
+        # UPDATE by primary key, executed as executemany.
+        await session.execute(update(Post), values)
+    await session.commit()
+
+    return existing
+
+
+async def delete_posts_bulk(
+    session: AsyncSession,
+    post_ids: list[int],
+) -> set[int]:
+    # One UPDATE writing tombstones, comments are removed later by the purge.
+    result = await session.execute(
+        update(Post)
+        .where(Post.id.in_(post_ids), Post.deleted_at.is_(None))
+        .values(deleted_at=datetime.now(), updated_at=Post.updated_at)
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set(result.scalars().all())
+    await session.commit()
+
+    return deleted
+
+
+async def purge_deleted_posts(session: AsyncSession, batch_size: int) -> int:
+    # One bounded step of the purge: at most `batch_size` comments of
+    # tombstoned posts, then those posts once they have none left. Returns the
+    # number of rows deleted, 0 once there is nothing left to purge.
+    result = await session.scalars(
+        select(Post.id)
+        .where(Post.deleted_at.is_not(None))
+        .order_by(Post.id)
+        .limit(batch_size)
+        .execution_options(include_deleted=True)
+    )
+    post_ids = result.all()
+    if not post_ids:
+        return 0
+
+    result = await session.execute(
+        delete(Comment)
+        .where(
+            Comment.id.in_(
+                select(Comment.id)
+                .where(Comment.post_id.in_(post_ids))
+                .limit(batch_size)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.rowcount
+
+    if deleted < batch_size:
+        result = await session.execute(
+            delete(Post)
+            .where(Post.id.in_(post_ids))
+            .execution_options(synchronize_session=False)
+        )
+        deleted += result.rowcount
+
+    await session.commit()
+
+    return deleted
+
+
+async def create_comments_bulk(
+    session: AsyncSession,
+    comments_create: list[CommentCreate],
+    post_id: int,
+) -> list[Comment] | None:
+    if not await post_exists(session, post_id):
+        return None
+
+    result = await session.scalars(
+        insert(Comment).returning(Comment, sort_by_parameter_order=True),
+        [
+            comment_create.model_dump() | {"post_id": post_id}
+            for comment_create in comments_create
+        ],
+    )
+    comments = result.all()
+    await _touch_post(session, post_id)
+    await session.commit()
+
+    return comments
+
+
+async def create_queued_comments(
+    session: AsyncSession,
+    comments: list[tuple[int, CommentCreate]],
+) -> set[int]:
+    # Posts may have been deleted since the comments were queued, those
+    # comments are dropped. Returns the posts that received comments.
+    result = await session.scalars(
+        select(Post.id).where(Post.id.in_({post_id for post_id, _ in comments}))
+    )
+    post_ids = set(result.all())
+
+    rows = [
+        comment_create.model_dump() | {"post_id": post_id}
+        for post_id, comment_create in comments
+        if post_id in post_ids
+    ]
+    if rows:
+        await session.execute(insert(Comment), rows)
+        await session.execute(
+            update(Post)
+            .where(Post.id.in_(post_ids))
+            .values(updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+    await session.commit()
+
+    return post_ids
+
+
+async def add_post_views(session: AsyncSession, views: Mapping[int, int]) -> None:
+    # UPDATE posts SET views = views + CASE id WHEN ... END WHERE id IN (...)
+    # Views are not an edit, keep updated_at and thus cached ETags as they are.
+    await session.execute(
+        update(Post)
+        .where(Post.id.in_(views))
+        .values(
+            views=Post.views + case(dict(views), value=Post.id, else_=0),
+            updated_at=Post.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
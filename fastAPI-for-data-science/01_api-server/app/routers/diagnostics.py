@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends
+
+from ..internal.cache import PostCache, get_post_cache
+from ..internal.comment_queue import CommentQueue, get_comment_queue
+from ..internal.database import engine, replica_engines
+from ..internal.singleflight import SingleFlight, get_post_reads
+
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/cache")
+async def cache_stats(cache: PostCache = Depends(get_post_cache)):
+    """
+    Report post cache counters, to help size the cache.
+
+    Example:
+        http ":8000/diagnostics/cache"
+
+    :param cache: The post cache injected by the dependency
+    :return: Dict with backend, hit and miss counters
+    """
+    return cache.stats()
+
+
+@router.get("/pool")
+async def pool_stats():
+    """
+    Report connection pool usage of the primary and replica engines.
+
+    Example:
+        http ":8000/diagnostics/pool"
+
+    :return: Dict with pool size, checked-out connections, overflow and wait time
+    """
+    return {
+        "primary": engine.pool.stats(),
+        "replicas": [replica.pool.stats() for replica in replica_engines],
+    }
+
+
+@router.get("/coalescing")
+async def coalescing_stats(flight: SingleFlight = Depends(get_post_reads)):
+    """
+    Report how many post reads ran a query and how many shared one in flight.
+
+    Example:
+        http ":8000/diagnostics/coalescing"
+
+    :param flight: The single-flight group injected by the dependency
+    :return: Dict with in-flight, leader and coalesced counters
+    """
+    return flight.stats()
+
+
+@router.get("/comment-queue")
+async def comment_queue_stats(queue: CommentQueue = Depends(get_comment_queue)):
+    """
+    Report the write-behind comment queue depth and counters.
+
+    Example:
+        http ":8000/diagnostics/comment-queue"
+
+    :param queue: The comment queue injected by the dependency
+    :return: Dict with pending, accepted, rejected and flushed counters
+    """
+    return queue.stats()
@@ -1,33 +1,59 @@
 from fastapi import APIRouter, Header, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 
+from ..internal.compression import PrecomputedResponse, settings
+
 router = APIRouter(prefix="/http", tags=["http"])
 
+ECHOED_HEADERS = ("accept", "accept-encoding", "connection", "host", "user-agent")
+
+HTML = PrecomputedResponse(
+    b"""
+        <html> 
+            <head>
+                <title>Hello world!</title>
+            </head>
+            <body> 
+                <h1>Hello world!</h1>
+            </body>
+        </html>
+    """,
+    "text/html",
+    settings,
+)
+
+HTML_NEXT = PrecomputedResponse(
+    b"""
+        <html> 
+            <head>
+                <title>Hello world!</title>
+            </head>
+            <body> 
+                <h1>You've been redirected!</h1>
+            </body>
+        </html>
+    """,
+    "text/html",
+    settings,
+)
+
 
 @router.get("/")
-async def root(
-    accept: str = Header(...),
-    accept_encoding: str = Header(...),
-    connection: str = Header(...),
-    host: str = Header(...),
-    user_agent: str = Header(...),
-):
-    return {
-        "accept": accept,
-        "accept_encoding": accept_encoding,
-        "connection": connection,
-        "host": host,
-        "user_agent": user_agent,
-    }
+async def root(request: Request):
+    # Read straight from the request rather than through one dependency per
+    # header, this is hit at probe rates. Missing headers are reported as null.
+    headers = request.headers
+    return {name.replace("-", "_"): headers.get(name) for name in ECHOED_HEADERS}
 
 
 @router.get("/request")
 async def request(request: Request):
+    query = dict(request.query_params)
     return {
         "headers": dict(request.headers),
-        "cookies": dict(request.cookies),
-        "query": dict(request.query_params),
-        "params": dict(request.query_params),
+        "cookies": request.cookies,
+        "query": query,
+        "params": query,
     }
 
 
@@ -41,17 +67,8 @@ async def response(response: Response):
 
 
 @router.get("/html", response_class=HTMLResponse)
-async def html():
-    return """
-        <html> 
-            <head>
-                <title>Hello world!</title>
-            </head>
-            <body> 
-                <h1>Hello world!</h1>
-            </body>
-        </html>
-    """
+async def html(accept_encoding: str | None = Header(None)):
+    return HTML.response(accept_encoding)
 
 
 @router.get("/redirect")
@@ -60,14 +77,5 @@ async def redirect():
 
 
 @router.get("/html-next", response_class=HTMLResponse)
-async def html_next():
-    return """
-        <html> 
-            <head>
-                <title>Hello world!</title>
-            </head>
-            <body> 
-                <h1>You've been redirected!</h1>
-            </body>
-        </html>
-    """
+async def html_next(accept_encoding: str | None = Header(None)):
+    return HTML_NEXT.response(accept_encoding)
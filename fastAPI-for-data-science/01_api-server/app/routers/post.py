@@ -1,62 +1,290 @@
-from typing import List
-from collections.abc import Sequence
-
-from fastapi import Depends, APIRouter, status, HTTPException
+from typing import List, Literal
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+
+from fastapi import (
+    Body,
+    Depends,
+    APIRouter,
+    Header,
+    Query,
+    Response,
+    status,
+    HTTPException,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..internal.cache import PostCache, get_post_cache
+from ..internal.comment_queue import CommentQueue, QueueFull, get_comment_queue
+from ..internal.conditional import http_date, is_not_modified, make_etag
 from ..internal.database import get_async_session
-from ..dto.post import PostRead, PostCreate, PostUpdate, PostPagination
-from ..dto.comment import CommentRead, CommentCreate
+from ..internal.singleflight import SingleFlight, get_post_reads
+from ..internal.views import ViewCounter, get_view_counter
+from ..dto.post import (
+    BULK_MAXIMUM_SIZE,
+    BulkItemResult,
+    PostBulkDelete,
+    PostBulkUpdate,
+    PostCreate,
+    PostPagination,
+    PostRead,
+    PostSort,
+    PostUpdate,
+)
+from ..dto.comment import CommentRead, CommentCreate, CommentQueued
+from ..dto.cursor import decode_rank_cursor, encode_cursor, encode_rank_cursor
 from ..models.post import Post
 from ..models.comment import Comment
 from ..repository.post import (
-    get_post_by_id,
+    get_post_read_cached,
+    get_post_read_coalesced,
+    get_post_version,
+    invalidate_cached_posts,
     list_posts_all,
+    list_post_rows_all,
+    list_post_rows_paginated,
+    stream_posts_all,
     list_posts_paginated,
+    list_posts_after,
+    list_comments_paginated,
+    post_exists,
+    search_posts,
     create_post,
     update_post,
     delete_post,
     create_comment,
+    create_posts_bulk,
+    update_posts_bulk,
+    delete_posts_bulk,
+    create_comments_bulk,
 )
 
 router = APIRouter(prefix="/posts", tags=["post"])
 post_pagination = PostPagination(maximum_limit=50)
+comment_pagination = PostPagination(maximum_limit=100)
+search_pagination = PostPagination(maximum_limit=50, decode=decode_rank_cursor)
+
+comments_limit_query = Query(
+    None,
+    ge=0,
+    le=100,
+    description="Embed only the comment count and the first N comments",
+)
+
+sort_description = "Order of the posts, only index-backed orderings, - for descending"
+
+fast_query = Query(
+    False,
+    description="Serialize plain rows straight to JSON, skipping model validation",
+)
+
+
+def _post_version(post: Post | PostRead) -> tuple[int, datetime, int]:
+    comment_count = post.comment_count
+    if comment_count is None:
+        comment_count = len(post.comments)
+    return post.id, post.updated_at or post.publication_date, comment_count
+
+
+def _row_version(row: dict) -> tuple[int, datetime, int]:
+    comment_count = row["comment_count"]
+    if comment_count is None:
+        comment_count = len(row["comments"])
+    return row["id"], row["updated_at"] or row["publication_date"], comment_count
+
+
+def _json_response(rows: list[dict], headers: dict | None = None) -> Response:
+    return Response(
+        content=to_json(rows), media_type="application/json", headers=headers
+    )
 
 
 @router.get("/all", response_model=List[PostRead])
 async def read_all_posts_route(
+    comments_limit: int | None = comments_limit_query,
+    sort: PostSort = Query("id", description=sort_description),
+    fast: bool = fast_query,
     session: AsyncSession = Depends(get_async_session),
-) -> Sequence[Post]:
+) -> Sequence[Post] | Response:
     """
     Get all posts.
 
     Example:
         http ":8000/posts/all"
+        http ":8000/posts/all?comments_limit=3"
+        http ":8000/posts/all?fast=true"
+        http ":8000/posts/all?sort=-publication_date"
 
+    :param comments_limit: Embed only the comment count and the first N comments
+    :param sort: The ordering of the posts, by id by default
+    :param fast: Serialize plain rows straight to JSON, skipping model validation
     :param session: The session object injected by the dependency
     :return: A list of Post model
     """
-    return await list_posts_all(session)
+    if fast:
+        return _json_response(await list_post_rows_all(session, comments_limit, sort))
+
+    return await list_posts_all(session, comments_limit, sort)
+
+
+async def _encode_posts(
+    posts: AsyncIterator[Post],
+    format: Literal["ndjson", "json"],
+) -> AsyncIterator[str]:
+    if format == "ndjson":
+        async for post in posts:
+            yield PostRead.model_validate(post).model_dump_json() + "\n"
+        return
+
+    separator = "["
+    async for post in posts:
+        yield separator + PostRead.model_validate(post).model_dump_json()
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+@router.get("/export")
+async def export_posts_route(
+    format: Literal["ndjson", "json"] = "ndjson",
+    session: AsyncSession = Depends(get_async_session),
+) -> StreamingResponse:
+    """
+    Stream all posts with their comments, one post at a time.
+
+    Unlike `/posts/all`, nothing is buffered: posts are read through a
+    server-side cursor and written to the response as they are serialized.
+
+    Example:
+        http --stream ":8000/posts/export"
+        http --stream ":8000/posts/export?format=json"
+
+    :param format: `ndjson` for one post per line, `json` for a chunked array
+    :param session: The session object injected by the dependency
+
+    :return: A streaming response of PostRead documents
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        _encode_posts(stream_posts_all(session), format), media_type=media_type
+    )
+
+
+@router.get("/search", response_model=List[PostRead])
+async def search_posts_route(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    pagination: tuple = Depends(search_pagination),
+    comments_limit: int | None = comments_limit_query,
+    session: AsyncSession = Depends(get_async_session),
+) -> list[Post]:
+    """
+    Search posts by title and content, best matches first.
+
+    Backed by a full-text index, a GIN index on Postgres and an FTS5 table on
+    SQLite. Follow the `X-Next-Cursor` header to walk pages.
+
+    Example:
+        http ":8000/posts/search?q=fastapi"
+        http ":8000/posts/search?q=fastapi&after=<X-Next-Cursor>"
+
+    :param response: The response object used to set the cursor header
+    :param q: The words to search for, all of them must match
+    :param pagination: A tuple containing skip, limit and the decoded cursor
+    :param comments_limit: Embed only the comment count and the first N comments
+    :param session: The session object injected by the dependency
+
+    :return: A ranked list of Post model
+    """
+    skip, limit, after = pagination
+    rows = await search_posts(session, q, skip or 0, limit, after, comments_limit)
+
+    if rows and len(rows) == limit:
+        post, score = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_rank_cursor(score, post.id)
+
+    return [post for post, _ in rows]
 
 
 @router.get("/", response_model=List[PostRead])
 async def read_posts_paginated_route(
-    pagination: tuple[int, int] = Depends(post_pagination),
+    response: Response,
+    pagination: tuple = Depends(post_pagination),
+    comments_limit: int | None = comments_limit_query,
+    sort: PostSort | None = Query(None, description=sort_description),
+    fast: bool = fast_query,
+    if_none_match: str | None = Header(None),
     session: AsyncSession = Depends(get_async_session),
-) -> Sequence[Post]:
+) -> Sequence[Post] | Response:
     """
-    Get all posts paginated.
+    Get all posts paginated, ordered by publication date unless `sort` says
+    otherwise. Cursors are only valid for the ordering they were issued for.
 
-    Example:
-        http ":8000/posts/?limit=10&offset=0"
+    The cursor returned in the `X-Next-Cursor` header is the recommended way to
+    walk pages, since it seeks straight to the next page. `skip` is kept for
+    compatibility but gets slower the deeper the page, and requests sending it
+    keep the id order offset pages always had unless `sort` is given.
+
+    With `fast=true` the page is read as plain rows and encoded to JSON in one
+    pass, which skips building ORM objects and validating them against PostRead.
 
-    :param pagination: A tuple containing skip and limit values
+    Example:
+        http ":8000/posts/?limit=10"
+        http ":8000/posts/?limit=10&after=<X-Next-Cursor>"
+        http ":8000/posts/?limit=10&skip=0"
+        http ":8000/posts/?limit=10&comments_limit=0"
+        http ":8000/posts/?limit=10&fast=true"
+        http ":8000/posts/?limit=10&sort=-publication_date"
+
+    :param response: The response object used to set the cursor header
+    :param pagination: A tuple containing skip, limit and the decoded cursor
+    :param comments_limit: Embed only the comment count and the first N comments
+    :param sort: The ordering of the posts, by id for `skip` requests by default
+    :param fast: Serialize plain rows straight to JSON, skipping model validation
+    :param if_none_match: The ETag of the page the client already has
     :param session: The session object injected by the dependency
 
-    :return: A paginated list of Post model
+    :return: A paginated list of Post model, or 304 if the page is unchanged
     """
-    skip, limit = pagination
-    return await list_posts_paginated(session, skip, limit)
+    skip, limit, after = pagination
+    if sort is None:
+        sort = "id" if skip is not None else "publication_date"
+    skip = skip or 0
+
+    if fast:
+        rows = await list_post_rows_paginated(
+            session, skip, limit, after, comments_limit, sort
+        )
+
+        if rows and len(rows) == limit:
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                last["publication_date"], last["id"]
+            )
+
+        response.headers["ETag"] = make_etag(_row_version(row) for row in rows)
+        if is_not_modified(response.headers["ETag"], None, if_none_match, None):
+            return Response(status_code=304, headers=dict(response.headers))
+
+        return _json_response(rows, dict(response.headers))
+
+    if after is not None:
+        posts = await list_posts_after(session, after, limit, comments_limit, sort)
+    else:
+        posts = await list_posts_paginated(session, skip, limit, comments_limit, sort)
+
+    if posts and len(posts) == limit:
+        last = posts[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            last.publication_date, last.id
+        )
+
+    response.headers["ETag"] = make_etag(_post_version(post) for post in posts)
+    if is_not_modified(response.headers["ETag"], None, if_none_match, None):
+        return Response(status_code=304, headers=dict(response.headers))
+
+    return posts
 
 
 @router.post("/", response_model=PostRead, status_code=status.HTTP_201_CREATED)
@@ -79,27 +307,153 @@ async def create_post_route(
     return await create_post(session, post_create)
 
 
+@router.post(
+    "/bulk", response_model=List[PostRead], status_code=status.HTTP_201_CREATED
+)
+async def create_posts_bulk_route(
+    posts_create: List[PostCreate] = Body(min_length=1, max_length=BULK_MAXIMUM_SIZE),
+    session: AsyncSession = Depends(get_async_session),
+) -> Sequence[Post]:
+    """
+    Create many posts in a single transaction.
+
+    Example:
+        echo '[{"title": "A", "content": "a"}, {"title": "B", "content": "b"}]' \
+        | http POST :8000/posts/bulk --json
+
+    :param posts_create: The post objects received in request body
+    :param session: The session object injected by the dependency
+
+    :return: The created Post models, in request order
+    """
+    return await create_posts_bulk(session, posts_create)
+
+
+@router.put("/bulk", response_model=List[BulkItemResult])
+async def update_posts_bulk_route(
+    posts_update: List[PostBulkUpdate] = Body(
+        min_length=1, max_length=BULK_MAXIMUM_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    cache: PostCache = Depends(get_post_cache),
+) -> list[BulkItemResult]:
+    """
+    Update many posts in a single transaction.
+
+    Example:
+        echo '[{"id": 1, "title": "Updated"}, {"id": 2, "content": "New"}]' \
+        | http PUT :8000/posts/bulk --json
+
+    :param posts_update: The partial post objects, each carrying its id
+    :param session: The session object injected by the dependency
+    :param cache: The post cache injected by the dependency
+
+    :return: One result per requested post, in request order
+    """
+    updated = await update_posts_bulk(session, posts_update)
+    await invalidate_cached_posts(cache, updated)
+
+    return [
+        BulkItemResult(
+            id=post_update.id,
+            status="updated" if post_update.id in updated else "not_found",
+        )
+        for post_update in posts_update
+    ]
+
+
+@router.post("/bulk/delete", response_model=List[BulkItemResult])
+async def delete_posts_bulk_route(
+    post_delete: PostBulkDelete,
+    session: AsyncSession = Depends(get_async_session),
+    cache: PostCache = Depends(get_post_cache),
+) -> list[BulkItemResult]:
+    """
+    Mark many posts as deleted in a single transaction. They disappear from
+    reads at once, the purge task removes them and their comments later.
+
+    Example:
+        echo '{"ids": [1, 2, 3]}' | http POST :8000/posts/bulk/delete --json
+
+    :param post_delete: The ids of the posts to delete
+    :param session: The session object injected by the dependency
+    :param cache: The post cache injected by the dependency
+
+    :return: One result per requested id, in request order
+    """
+    deleted = await delete_posts_bulk(session, post_delete.ids)
+    await invalidate_cached_posts(cache, deleted)
+
+    return [
+        BulkItemResult(id=id, status="deleted" if id in deleted else "not_found")
+        for id in post_delete.ids
+    ]
+
+
 @router.get("/{id}", response_model=PostRead)
 async def read__post_route(
     id: int,
+    response: Response,
+    comments_limit: int | None = comments_limit_query,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
     session: AsyncSession = Depends(get_async_session),
-) -> Post:
+    cache: PostCache = Depends(get_post_cache),
+    views: ViewCounter = Depends(get_view_counter),
+    flight: SingleFlight = Depends(get_post_reads),
+) -> PostRead | Response:
     """
-    Get a single post.
+    Get a single post. Full posts are served from the post cache when possible,
+    and concurrent reads of the same post share one database query.
+
+    Conditional requests only look up the post version (last update and
+    comment count) and answer 304 when the client copy is current.
 
     Example:
         http ":8000/posts/1"
+        http ":8000/posts/1?comments_limit=5"
+        http ":8000/posts/1" If-None-Match:'<ETag>'
 
     :param id: The post id passed by request
+    :param response: The response object used to set the validator headers
+    :param comments_limit: Embed only the comment count and the first N comments
+    :param if_none_match: The ETag of the post the client already has
+    :param if_modified_since: The Last-Modified of the post the client already has
     :param session: The session object injected by the dependency
+    :param cache: The post cache injected by the dependency
+    :param views: The view counter injected by the dependency
+    :param flight: The single-flight group coalescing concurrent post reads
 
-    :return: A single Post model
+    :return: A single post, or 304 if the client copy is current
     """
-    post = await get_post_by_id(session, id)
+    if if_none_match is not None or if_modified_since is not None:
+        version = await get_post_version(session, id)
+
+        if version is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+
+        etag, last_modified = make_etag([tuple(version)]), version[1]
+        if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+            views.record(id)
+            return Response(
+                status_code=304,
+                headers={"ETag": etag, "Last-Modified": http_date(last_modified)},
+            )
+
+    if comments_limit is None:
+        post = await get_post_read_cached(session, cache, id, flight)
+    else:
+        post = await get_post_read_coalesced(session, flight, id, comments_limit)
 
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    views.record(id)
+
+    version = _post_version(post)
+    response.headers["ETag"] = make_etag([version])
+    response.headers["Last-Modified"] = http_date(version[1])
+
     return post
 
 
@@ -108,6 +462,7 @@ async def update_post_route(
     id: int,
     post_update: PostUpdate,
     session: AsyncSession = Depends(get_async_session),
+    cache: PostCache = Depends(get_post_cache),
 ) -> Post:
     """
     Update a post.
@@ -118,6 +473,7 @@ async def update_post_route(
     :param id: The post id passed by request
     :param post_update: Updated post data
     :param session: The session object injected by dependency
+    :param cache: The post cache injected by the dependency
 
     :return: Updated Post model
     """
@@ -126,6 +482,8 @@ async def update_post_route(
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    await invalidate_cached_posts(cache, [id])
+
     return post
 
 
@@ -133,6 +491,7 @@ async def update_post_route(
 async def delete_post_route(
     id: int,
     session: AsyncSession = Depends(get_async_session),
+    cache: PostCache = Depends(get_post_cache),
 ) -> None:
     """
     Delete a post.
@@ -142,31 +501,154 @@ async def delete_post_route(
 
     :param id: The post id passed by request
     :param session: The session object injected by dependency
+    :param cache: The post cache injected by the dependency
     """
     deleted = await delete_post(session, id)
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    await invalidate_cached_posts(cache, [id])
+
     return None
 
 
+@router.get("/{id}/comments", response_model=List[CommentRead])
+async def read_post_comments_route(
+    id: int,
+    response: Response,
+    pagination: tuple = Depends(comment_pagination),
+    session: AsyncSession = Depends(get_async_session),
+) -> Sequence[Comment]:
+    """
+    Get the comments of a post paginated, ordered by publication date.
+
+    As for posts, follow the `X-Next-Cursor` header to walk pages.
+
+    Example:
+        http ":8000/posts/1/comments?limit=20"
+        http ":8000/posts/1/comments?limit=20&after=<X-Next-Cursor>"
+
+    :param id: The post id passed by request
+    :param response: The response object used to set the cursor header
+    :param pagination: A tuple containing skip, limit and the decoded cursor
+    :param session: The session object injected by the dependency
+
+    :return: A paginated list of Comment model
+    """
+    if not await post_exists(session, id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    skip, limit, after = pagination
+    comments = await list_comments_paginated(session, id, skip or 0, limit, after)
+
+    if comments and len(comments) == limit:
+        last = comments[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            last.publication_date, last.id
+        )
+
+    return comments
+
+
 @router.post(
-    "/{id}/comments", response_model=CommentRead, status_code=status.HTTP_201_CREATED
+    "/{id}/comments",
+    response_model=CommentRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_202_ACCEPTED: {"model": CommentQueued},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Comment queue is full"},
+    },
 )
 async def create_post_comment_route(
     id: int,
     comment_create: CommentCreate,
+    queue: bool = Query(
+        False, description="Accept the comment and write it in the next batch"
+    ),
     session: AsyncSession = Depends(get_async_session),
-) -> Comment:
+    cache: PostCache = Depends(get_post_cache),
+    comment_queue: CommentQueue = Depends(get_comment_queue),
+) -> Comment | JSONResponse:
     """
     Create a new comment.
 
+    With `queue=true` the comment is only validated and queued, it is written
+    with other queued comments shortly after. The response is 202 with a
+    provisional id, or 429 when the queue is full.
+
     Example:
         echo '{"content": "This is a comment"}' \
         | http POST :8000/posts/1/comments --json
+        echo '{"content": "This is a comment"}' \
+        | http POST ":8000/posts/1/comments?queue=true" --json
 
     :param comment_create: The comment object received in request body
+    :param queue: Accept the comment and write it in the next batch
+    :param session: The session object injected by the dependency
+    :param cache: The post cache injected by the dependency
+    :param comment_queue: The write-behind comment queue injected by the dependency
+    """
+    if queue:
+        if not await post_exists(session, id):
+            raise HTTPException(status_code=404, detail="Post not found")
+
+        try:
+            provisional_id = comment_queue.put(id, comment_create)
+        except QueueFull:
+            raise HTTPException(
+                status_code=429,
+                detail="Comment queue is full",
+                headers={"Retry-After": "1"},
+            )
+
+        queued = CommentQueued(provisional_id=provisional_id, post_id=id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED, content=queued.model_dump()
+        )
+
+    comment = await create_comment(session, comment_create, post_id=id)
+
+    if comment is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    await invalidate_cached_posts(cache, [id])
+
+    return comment
+
+
+@router.post(
+    "/{id}/comments/bulk",
+    response_model=List[CommentRead],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_post_comments_bulk_route(
+    id: int,
+    comments_create: List[CommentCreate] = Body(
+        min_length=1, max_length=BULK_MAXIMUM_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    cache: PostCache = Depends(get_post_cache),
+) -> Sequence[Comment]:
+    """
+    Create many comments on a post in a single transaction.
+
+    Example:
+        echo '[{"content": "First"}, {"content": "Second"}]' \
+        | http POST :8000/posts/1/comments/bulk --json
+
+    :param id: The post id passed by request
+    :param comments_create: The comment objects received in request body
     :param session: The session object injected by the dependency
+    :param cache: The post cache injected by the dependency
+
+    :return: The created Comment models, in request order
     """
-    return await create_comment(session, comment_create, post_id=id)
+    comments = await create_comments_bulk(session, comments_create, post_id=id)
+
+    if comments is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    await invalidate_cached_posts(cache, [id])
+
+    return comments
@@ -1,6 +1,16 @@
-from fastapi import APIRouter
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from pydantic_core import to_json
 
-from ..dto.temperature import Temperature
+from ..dto.temperature import Temperature, TemperatureConvert
+from ..internal.timeseries import LineTooLong, TemperatureStream
 
 
 router = APIRouter(prefix="/temperature", tags=["temperature"])
@@ -23,3 +33,84 @@ async def compare(t1: Temperature, t2: Temperature):
         "t1_kelvin": t1.value_kelvin,
         "t2_kelvin": t2.value_kelvin,
     }
+
+
+@router.post("/convert")
+async def convert(batch: TemperatureConvert) -> Response:
+    """
+    Convert a batch of readings to Kelvin in one vectorized pass, optionally
+    comparing them element-wise with a second batch of the same length.
+
+    Example:
+        echo '{"readings": {"values": [25, 77, 300], "scales": ["C", "F", "K"]}}' | http POST ":8000/temperature/convert"
+        echo '{"readings": {"values": [25, 30], "scales": "C"}, "compare_to": {"values": [77, 77], "scales": "F"}}' | http POST ":8000/temperature/convert"
+
+    :param batch: The readings, and optionally the temperatures to compare them to
+    :return: Dict with Kelvin values and, when comparing, the equality booleans
+        and the comparison sign (-1 colder, 0 equal, 1 warmer) of each pair
+    """
+    kelvin = batch.readings.to_kelvin()
+    result = {"kelvin": kelvin.tolist()}
+
+    if batch.compare_to is not None:
+        other_kelvin = batch.compare_to.to_kelvin()
+        comparison = np.sign(kelvin - other_kelvin).astype(np.int8)
+        result["compare_to_kelvin"] = other_kelvin.tolist()
+        result["equality"] = (comparison == 0).tolist()
+        result["comparison"] = comparison.tolist()
+
+    return Response(content=to_json(result), media_type="application/json")
+
+
+@router.websocket("/ingest")
+async def ingest(
+    websocket: WebSocket,
+    window: int = Query(1000, ge=1, le=1_000_000),
+    batch_size: int = Query(1000, ge=1, le=100_000),
+):
+    """
+    Ingest a stream of readings as NDJSON, `{"value", "scale", "timestamp"}`
+    per line, in messages of any size. Each time `window` readings have been
+    received, their min, max and mean in Kelvin are sent back. An empty
+    message ends the stream: the last partial window and a summary are sent,
+    then the socket is closed. Memory stays constant whatever the stream length,
+    a line over 4 KB closes the socket with 1009 (message too big) and a binary
+    message with 1003 (unsupported data).
+
+    Example:
+        websocat "ws://localhost:8000/temperature/ingest?window=100" < readings.ndjson
+
+    :param websocket: The websocket connection
+    :param window: The number of readings per aggregated window
+    :param batch_size: The number of readings converted to Kelvin at once
+    """
+    await websocket.accept()
+    stream = TemperatureStream(window, batch_size)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            data = message.get("text")
+            if data is None:
+                await websocket.close(
+                    code=status.WS_1003_UNSUPPORTED_DATA, reason="Text frames only"
+                )
+                return
+            if not data:
+                break
+
+            for aggregate in stream.feed(data.encode()):
+                await websocket.send_text(to_json(aggregate).decode())
+
+        for aggregate in stream.close():
+            await websocket.send_text(to_json(aggregate).decode())
+        await websocket.send_text(to_json(stream.summary()).decode())
+        await websocket.close()
+    except LineTooLong:
+        await websocket.close(
+            code=status.WS_1009_MESSAGE_TOO_BIG, reason="Line too long"
+        )
+    except WebSocketDisconnect:
+        pass
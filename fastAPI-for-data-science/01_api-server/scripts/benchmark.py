@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from httpx import ASGITransport, AsyncClient, Response
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+logging.getLogger("app").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+ROUTES = ["list", "paginate", "get", "create", "update", "comment", "delete"]
+
+
+@dataclass
+class RouteResult:
+    route: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def percentile(self, p: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100)[p - 1]
+
+    def summary(self) -> dict:
+        requests = len(self.latencies)
+        return {
+            "route": self.route,
+            "requests": requests,
+            "errors": self.errors,
+            "throughput": requests / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+        }
+
+
+class Scenario:
+    """
+    Builds the request of each route. Posts created by `create` are the ones
+    updated, commented and finally deleted, so the seeded rows stay intact.
+    """
+
+    def __init__(self, client: AsyncClient, posts: int, seed: int):
+        self.client = client
+        self.posts = posts
+        self.random = random.Random(seed)
+        self.created: list[int] = []
+        self.cursors: dict[int, str | None] = {}
+
+    async def list(self, worker: int) -> Response:
+        return await self.client.get("/posts/", params={"limit": 20})
+
+    async def paginate(self, worker: int) -> Response:
+        # Each worker walks the listing with its own cursor.
+        params = {"limit": 20}
+        if cursor := self.cursors.get(worker):
+            params["after"] = cursor
+        response = await self.client.get("/posts/", params=params)
+        self.cursors[worker] = response.headers.get("X-Next-Cursor")
+        return response
+
+    async def get(self, worker: int) -> Response:
+        return await self.client.get(f"/posts/{self.random.randint(1, self.posts)}")
+
+    async def create(self, worker: int) -> Response:
+        response = await self.client.post(
+            "/posts/", json={"title": "Benchmark", "content": "Created by a worker"}
+        )
+        if response.status_code == 201:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def update(self, worker: int) -> Response:
+        id = self.random.choice(self.created)
+        return await self.client.put(f"/posts/{id}", json={"title": "Updated"})
+
+    async def comment(self, worker: int) -> Response:
+        id = self.random.choice(self.created)
+        return await self.client.post(
+            f"/posts/{id}/comments", json={"content": "Benchmark comment"}
+        )
+
+    async def delete(self, worker: int) -> Response:
+        return await self.client.delete(f"/posts/{self.created.pop()}")
+
+
+async def drive(
+    route: str,
+    send: Callable[[int], Awaitable[Response]],
+    requests: int,
+    concurrency: int,
+) -> RouteResult:
+    result = RouteResult(route)
+    remaining = iter(range(requests))
+
+    async def worker(index: int) -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await send(index)
+                ok = response.is_success
+            except Exception:
+                ok = False
+            if ok:
+                result.latencies.append(time.perf_counter() - start)
+            else:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+
+    return result
+
+
+async def benchmark(args: argparse.Namespace) -> list[dict]:
+    # The app reads its settings on import, configure the database first.
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app.internal.database import engine
+    from app.main import app, lifespan
+    from scripts.seed import seed
+
+    await seed(args.posts, args.comments_per_post, args.batch_size)
+
+    summaries = []
+    async with lifespan(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://app") as client:
+            scenario = Scenario(client, args.posts, args.seed)
+
+            for route in args.routes:
+                # Writes reuse the posts created by `create`, never more of them.
+                requests = args.requests
+                if route in ("update", "comment"):
+                    requests = requests if scenario.created else 0
+                elif route == "delete":
+                    requests = min(requests, len(scenario.created))
+
+                result = await drive(
+                    route, getattr(scenario, route), requests, args.concurrency
+                )
+                summaries.append(result.summary())
+
+    await engine.dispose()
+
+    return summaries
+
+
+def report(summaries: list[dict]) -> None:
+    logger.info(
+        f"{'route':<10}{'requests':>10}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for s in summaries:
+        logger.info(
+            f"{s['route']:<10}{s['requests']:>10}{s['errors']:>8}"
+            f"{s['throughput']:>10.1f}{s['p50_ms']:>10.2f}"
+            f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive the posts API concurrently and report latency per route."
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.getenv("DATABASE_URL", "sqlite+aiosqlite:///benchmark.db"),
+    )
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=ROUTES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results to a JSON file")
+    args = parser.parse_args()
+
+    summaries = asyncio.run(benchmark(args))
+    report(summaries)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(summaries, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import logging
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from app.internal.database import engine
+from app.main import app
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+logging.getLogger("app").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+async def measure(client: AsyncClient, path: str, params: dict, rounds: int) -> float:
+    await client.get(path, params=params)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+    return (time.perf_counter() - start) / rounds
+
+
+async def benchmark(limit: int, comments_limit: int | None, rounds: int) -> None:
+    params = {"limit": limit}
+    if comments_limit is not None:
+        params["comments_limit"] = comments_limit
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://app") as client:
+        regular = await measure(client, "/posts/", params, rounds)
+        fast = await measure(client, "/posts/", {**params, "fast": True}, rounds)
+
+    logger.info(f"regular: {regular * 1000:.2f} ms/request")
+    logger.info(f"fast:    {fast * 1000:.2f} ms/request ({regular / fast:.1f}x)")
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the regular and fast post listing serialization."
+    )
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--comments-limit", type=int, default=None)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.limit, args.comments_limit, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
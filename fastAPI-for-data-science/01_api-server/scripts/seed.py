@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.internal.database import create_all_tables, engine
+from app.models.comment import Comment
+from app.models.post import Post
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+logging.getLogger("app").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2024, 1, 1)
+# Ends the content of every seeded post, tells them apart from other rows.
+SEED_MARKER = "generated for benchmarking."
+
+POST_COLUMNS = ["id", "publication_date", "title", "content"]
+COMMENT_COLUMNS = ["post_id", "publication_date", "content"]
+
+
+def generate_posts(start: int, stop: int) -> Iterator[tuple]:
+    # Numbered from the epoch, so a rerun continues where the last one stopped.
+    for number in range(start, stop + 1):
+        yield (
+            EPOCH + timedelta(seconds=number),
+            f"Post {number}",
+            f"Content of post {number}, {SEED_MARKER}",
+        )
+
+
+def generate_comments(posts: list[tuple], per_post: int) -> Iterator[tuple]:
+    # `posts` pairs the id the database gave each post with its row.
+    for post_id, (publication_date, title, _) in posts:
+        for index in range(per_post):
+            yield (
+                post_id,
+                publication_date + timedelta(milliseconds=index),
+                f"Comment {index + 1} for {title.lower()}",
+            )
+
+
+def batched(rows: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def insert_posts(connection: AsyncConnection, rows: list[tuple]) -> list[int]:
+    table = Post.__table__
+
+    if connection.dialect.name == "postgresql":
+        # COPY cannot return the ids, reserve them from the sequence first.
+        result = await connection.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('posts', 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": len(rows)},
+        )
+        ids = list(result.scalars())
+        await copy_rows(
+            connection,
+            table,
+            POST_COLUMNS,
+            [(id, *row) for id, row in zip(ids, rows)],
+        )
+        return ids
+
+    result = await connection.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        [dict(zip(POST_COLUMNS[1:], row)) for row in rows],
+    )
+    return list(result.scalars())
+
+
+async def copy_rows(
+    connection: AsyncConnection,
+    table,
+    columns: list[str],
+    rows: list[tuple],
+) -> None:
+    if connection.dialect.name == "postgresql":
+        # COPY through asyncpg's binary protocol, the fastest way in.
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name, records=rows, columns=columns
+        )
+    else:
+        await connection.execute(
+            insert(table), [dict(zip(columns, row)) for row in rows]
+        )
+
+
+async def seeded_posts() -> int:
+    # The number of the last seeded post, read back from its publication date.
+    table = Post.__table__
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            select(func.max(table.c.publication_date)).where(
+                table.c.content.endswith(SEED_MARKER)
+            )
+        )
+        last = result.scalar()
+    return int((last - EPOCH).total_seconds()) if last else 0
+
+
+async def seed(posts: int, comments_per_post: int, batch_size: int) -> None:
+    await create_all_tables()
+
+    # Idempotent: posts are numbered, only the ones past the last seeded post
+    # are generated. Each batch of posts is loaded with its comments in one
+    # transaction, attached to the ids the database returned for the posts,
+    # so an interrupted run can be resumed.
+    loaded = 0
+    start = time.perf_counter()
+
+    for batch in batched(generate_posts(await seeded_posts() + 1, posts), batch_size):
+        async with engine.begin() as connection:
+            ids = await insert_posts(connection, batch)
+            loaded += len(ids)
+            for comments in batched(
+                generate_comments(list(zip(ids, batch)), comments_per_post),
+                batch_size,
+            ):
+                await copy_rows(
+                    connection, Comment.__table__, COMMENT_COLUMNS, comments
+                )
+                loaded += len(comments)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"{loaded} rows, {loaded / elapsed:,.0f} rows/sec")
+
+    elapsed = time.perf_counter() - start
+    rate = loaded / elapsed if elapsed else 0
+    logger.info(f"Loaded {loaded} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed posts and comments in bulk.")
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.posts, args.comments_per_post, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
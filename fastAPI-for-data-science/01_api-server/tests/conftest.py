@@ -6,7 +6,11 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.internal.cache import TTLCache, get_post_cache
+from app.internal.comment_queue import CommentQueue, get_comment_queue
 from app.internal.database import get_async_session
+from app.internal.singleflight import SingleFlight, get_post_reads
+from app.internal.views import ViewCounter, get_view_counter
 from app.models.base import Base
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -43,10 +47,19 @@ async def session() -> AsyncGenerator[AsyncSession, None]:
 
 @pytest.fixture(scope="function")
 async def client(session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+    post_cache = TTLCache()
+    view_counter = ViewCounter()
+    post_reads = SingleFlight()
+    comment_queue = CommentQueue(maxsize=5, batch_size=2)
+
     def override_get_async_session():
         yield session
 
     app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_post_cache] = lambda: post_cache
+    app.dependency_overrides[get_view_counter] = lambda: view_counter
+    app.dependency_overrides[get_post_reads] = lambda: post_reads
+    app.dependency_overrides[get_comment_queue] = lambda: comment_queue
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
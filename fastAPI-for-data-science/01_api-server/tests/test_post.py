@@ -1,6 +1,34 @@
+import asyncio
+import json
+
 import pytest
 from httpx import AsyncClient
 from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.main import app
+from app.internal.compression import PrecomputedResponse, negotiate
+from app.internal.config import CompressionSettings, DatabaseSettings
+from app.internal.migrations import add_missing_columns, add_missing_indexes
+from app.internal.purge import PostPurger
+from app.dto.comment import CommentCreate
+from app.models.base import Base
+from app.models.comment import Comment
+from app.models.post import Post
+from app.repository.post import search_posts
+from app.internal.cache import TTLCache, get_post_cache
+from app.internal import comment_queue
+from app.internal.comment_queue import CommentQueue, get_comment_queue
+from app.internal.singleflight import SingleFlight
+from app.internal import views
+from app.internal.views import ViewCounter, get_view_counter
 
 
 @pytest.mark.asyncio
@@ -17,6 +45,161 @@ async def test_temperature_comparison(client: AsyncClient):
     assert data["t2_kelvin"] == 298.15
 
 
+@pytest.mark.asyncio
+async def test_temperature_batch_conversion(client: AsyncClient):
+    """Testing vectorized conversion and comparison of temperature batches"""
+
+    payload = {
+        "readings": {"values": [25, 77, 300], "scales": ["C", "F", "K"]},
+        "compare_to": {"values": [77, 77, 77], "scales": "F"},
+    }
+    response = await client.post("/temperature/convert", json=payload)
+    assert response.status_code == status.HTTP_200_OK
+
+    data = response.json()
+    assert data["kelvin"] == [298.15, 298.15, 300]
+    assert data["equality"] == [True, True, False]
+    assert data["comparison"] == [0, 0, 1]
+
+
+@pytest.mark.asyncio
+async def test_temperature_batch_length_mismatch(client: AsyncClient):
+    """Testing batches with more values than scales are rejected"""
+
+    mismatched = {"readings": {"values": [1, 2], "scales": ["C"]}}
+    response = await client.post("/temperature/convert", json=mismatched)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_temperature_stream_ingest():
+    """Testing windowed aggregates over a stream of NDJSON readings"""
+
+    lines = [
+        json.dumps(
+            {"value": value, "scale": "C", "timestamp": f"2024-01-01T00:00:0{i}"}
+        )
+        for i, value in enumerate([10, 20, 30, 40, 50])
+    ]
+    lines.insert(2, "not a reading")
+    ndjson = "\n".join(lines)
+
+    client = TestClient(app)
+    with client.websocket_connect("/temperature/ingest?window=2&batch_size=3") as ws:
+        # Messages do not have to end on a line boundary.
+        ws.send_text(ndjson[:25])
+        ws.send_text(ndjson[25:])
+        ws.send_text("")
+
+        windows = [ws.receive_json() for _ in range(3)]
+        summary = ws.receive_json()
+
+    assert [w["count"] for w in windows] == [2, 2, 1]
+    assert windows[0]["min"] == 283.15
+    assert windows[0]["max"] == 293.15
+    assert windows[1]["mean"] == pytest.approx(308.15)
+    assert windows[1]["start"] == "2024-01-01T00:00:02"
+    assert summary == {"readings": 5, "rejected": 1, "windows": 3}
+
+
+def test_temperature_stream_line_too_long():
+    """Test a line that never ends is not buffered forever."""
+
+    client = TestClient(app)
+    with client.websocket_connect("/temperature/ingest") as ws:
+        ws.send_text("1" * 3000)
+        ws.send_text("1" * 3000)
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            ws.receive_text()
+    assert disconnect.value.code == status.WS_1009_MESSAGE_TOO_BIG
+
+
+def test_temperature_stream_binary_message():
+    """Test a binary message closes the ingest socket with 1003."""
+
+    client = TestClient(app)
+    with client.websocket_connect("/temperature/ingest") as ws:
+        ws.send_bytes(b'{"value": 10, "scale": "C"}')
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            ws.receive_text()
+    assert disconnect.value.code == status.WS_1003_UNSUPPORTED_DATA
+
+
+@pytest.mark.asyncio
+async def test_response_compression(client: AsyncClient):
+    """Testing compression of responses above the size threshold"""
+
+    large = await client.get(
+        "/http/request", params={"q": "x" * 2000}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in large.headers["Vary"]
+    assert large.json()["query"] == {"q": "x" * 2000}
+
+
+@pytest.mark.asyncio
+async def test_small_response_uncompressed(client: AsyncClient):
+    """Testing responses under the size threshold are sent as they are"""
+
+    small = await client.get("/http/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.json()["accept_encoding"] == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_identity_encoding(client: AsyncClient):
+    """Testing clients asking for identity get uncompressed responses"""
+
+    identity = await client.get(
+        "/http/request",
+        params={"q": "x" * 2000},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "Content-Encoding" not in identity.headers
+
+
+@pytest.mark.asyncio
+async def test_static_page(client: AsyncClient):
+    """Testing static pages under the minimum size are only kept uncompressed"""
+
+    html = await client.get("/http/html", headers={"Accept-Encoding": "gzip"})
+    assert html.headers["Content-Type"].startswith("text/html")
+    assert "<h1>Hello world!</h1>" in html.text
+    assert "Content-Encoding" not in html.headers
+    assert "Vary" not in html.headers
+
+
+def test_precomputed_variants():
+    """Testing only encodings smaller than the original body are kept"""
+
+    everything = CompressionSettings(minimum_size=0)
+    assert list(PrecomputedResponse(b"tiny", "text/plain", everything).variants) == [
+        None
+    ]
+    page = PrecomputedResponse(b"<p>x</p>" * 500, "text/html", everything)
+    assert "gzip" in page.variants
+    assert page.response("gzip").headers["Content-Encoding"] == "gzip"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, br;q=0.5", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("identity", None),
+    ],
+)
+def test_negotiate(accept_encoding: str, expected: str | None):
+    """Testing the encoding picked for an Accept-Encoding header"""
+
+    assert negotiate(accept_encoding, ["br", "gzip"]) == expected
+
+
+def test_negotiate_wildcard():
+    """Testing a wildcard accepts any supported encoding"""
+
+    assert negotiate("*", ["gzip"]) == "gzip"
+
+
 @pytest.mark.asyncio
 async def test_create_post(client: AsyncClient):
     """Test creating a new post successfully."""
@@ -64,6 +247,22 @@ async def test_list_all_posts(client: AsyncClient):
     assert len(response.json()) >= 1
 
 
+@pytest.mark.asyncio
+async def test_partial_update_post(client: AsyncClient):
+    """Test updating only some fields of a post."""
+
+    create_resp = await client.post(
+        "/posts/", json={"title": "Draft", "content": "..."}
+    )
+    post = create_resp.json()
+
+    update_resp = await client.put(f"/posts/{post['id']}", json={"title": "Final"})
+    assert update_resp.status_code == status.HTTP_200_OK
+    assert update_resp.json()["title"] == "Final"
+    assert update_resp.json()["content"] == "..."
+    assert update_resp.json()["publication_date"] == post["publication_date"]
+
+
 @pytest.mark.asyncio
 async def test_delete_post(client: AsyncClient):
     """Test deleting a post."""
@@ -94,3 +293,846 @@ async def test_create_comment(client: AsyncClient):
 
     assert response.status_code == status.HTTP_201_CREATED
     assert response.json()["content"] == "Great post!"
+
+
+@pytest.mark.asyncio
+async def test_list_posts_with_cursor(client: AsyncClient):
+    """Test the keyset cursor walks the same pages as offsets."""
+
+    for i in range(5):
+        await client.post("/posts/", json={"title": f"Post {i}", "content": "..."})
+
+    first = await client.get("/posts/", params={"limit": 2})
+    assert first.status_code == status.HTTP_200_OK
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = await client.get("/posts/", params={"limit": 2, "after": cursor})
+    offset = await client.get(
+        "/posts/", params={"limit": 2, "skip": 2, "sort": "publication_date"}
+    )
+    assert second.status_code == status.HTTP_200_OK
+    assert [p["id"] for p in second.json()] == [p["id"] for p in offset.json()]
+
+
+@pytest.mark.asyncio
+async def test_last_page_has_no_cursor(client: AsyncClient):
+    """Test the last page of posts sends no next cursor."""
+
+    for i in range(5):
+        await client.post("/posts/", json={"title": f"Post {i}", "content": "..."})
+
+    last = await client.get("/posts/", params={"limit": 2, "skip": 4})
+    assert len(last.json()) == 1
+    assert "X-Next-Cursor" not in last.headers
+
+
+@pytest.mark.asyncio
+async def test_offset_pages_keep_id_order(client: AsyncClient):
+    """Test requests sending skip are ordered by id unless they ask otherwise."""
+
+    payload = [
+        {"title": f"Offset {i}", "content": ".", "publication_date": date}
+        for i, date in enumerate(["2031-01-02", "2031-01-01"])
+    ]
+    ids = [
+        post["id"] for post in (await client.post("/posts/bulk", json=payload)).json()
+    ]
+
+    by_id = await client.get("/posts/", params={"skip": 0, "limit": 50})
+    offset_ids = [p["id"] for p in by_id.json() if p["id"] in ids]
+    assert offset_ids == ids
+
+    by_date = await client.get("/posts/", params={"limit": 50})
+    assert [p["id"] for p in by_date.json() if p["id"] in ids] == ids[::-1]
+
+
+@pytest.mark.asyncio
+async def test_list_posts_invalid_cursor(client: AsyncClient):
+    """Test that a malformed cursor is rejected."""
+
+    response = await client.get("/posts/", params={"after": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_export_posts_ndjson(client: AsyncClient):
+    """Test streaming all posts, with their comments, as NDJSON."""
+
+    for i in range(3):
+        post = await client.post("/posts/", json={"title": f"P{i}", "content": "."})
+    await client.post(f"/posts/{post.json()['id']}/comments", json={"content": "Hi"})
+
+    ndjson = await client.get("/posts/export")
+    assert ndjson.status_code == status.HTTP_200_OK
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [p["title"] for p in lines] == ["P0", "P1", "P2"]
+    assert lines[-1]["comments"][0]["content"] == "Hi"
+
+
+@pytest.mark.asyncio
+async def test_export_posts_json_array(client: AsyncClient):
+    """Test streaming all posts as one JSON array holding the NDJSON documents."""
+
+    for i in range(3):
+        post = await client.post("/posts/", json={"title": f"P{i}", "content": "."})
+    await client.post(f"/posts/{post.json()['id']}/comments", json={"content": "Hi"})
+
+    ndjson = await client.get("/posts/export")
+    array = await client.get("/posts/export", params={"format": "json"})
+    assert array.status_code == status.HTTP_200_OK
+    assert array.json() == [json.loads(line) for line in ndjson.text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_posts(client: AsyncClient):
+    """Test bulk creating posts returns them in request order."""
+
+    payload = [{"title": f"Bulk {i}", "content": "..."} for i in range(3)]
+    create_resp = await client.post("/posts/bulk", json=payload)
+    assert create_resp.status_code == status.HTTP_201_CREATED
+    assert [p["title"] for p in create_resp.json()] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_posts(client: AsyncClient):
+    """Test bulk updating only sets the fields sent and reports missing posts."""
+
+    create_resp = await client.post("/posts/", json={"title": "Bulk", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    update_resp = await client.put(
+        "/posts/bulk", json=[{"id": post_id, "title": "Renamed"}, {"id": 9999}]
+    )
+    assert [r["status"] for r in update_resp.json()] == ["updated", "not_found"]
+
+    get_resp = await client.get(f"/posts/{post_id}")
+    assert get_resp.json()["title"] == "Renamed"
+    assert get_resp.json()["content"] == "."
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_comments(client: AsyncClient):
+    """Test bulk creating comments on a post."""
+
+    create_resp = await client.post("/posts/", json={"title": "Bulk", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    comments = [{"content": "One"}, {"content": "Two"}]
+    comment_resp = await client.post(f"/posts/{post_id}/comments/bulk", json=comments)
+    assert comment_resp.status_code == status.HTTP_201_CREATED
+    assert [c["content"] for c in comment_resp.json()] == ["One", "Two"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_posts(client: AsyncClient):
+    """Test bulk deleting posts and reporting missing ones."""
+
+    create_resp = await client.post("/posts/", json={"title": "Bulk", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    delete_resp = await client.post("/posts/bulk/delete", json={"ids": [post_id, 9999]})
+    assert [r["status"] for r in delete_resp.json()] == ["deleted", "not_found"]
+
+    get_resp = await client.get(f"/posts/{post_id}")
+    assert get_resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_empty_lists(client: AsyncClient):
+    """Test empty bulk requests are rejected instead of inserting a blank row."""
+
+    create_resp = await client.post("/posts/", json={"title": "Empty", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    for method, path, payload in [
+        ("POST", "/posts/bulk", []),
+        ("PUT", "/posts/bulk", []),
+        ("POST", f"/posts/{post_id}/comments/bulk", []),
+        ("POST", "/posts/bulk/delete", {"ids": []}),
+    ]:
+        response = await client.request(method, path, json=payload)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_update_rejects_null_fields(client: AsyncClient):
+    """Test title and content can be left out of updates but not set to null."""
+
+    create_resp = await client.post("/posts/", json={"title": "Null", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    single = await client.put(f"/posts/{post_id}", json={"title": None})
+    assert single.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    bulk = await client.put("/posts/bulk", json=[{"id": post_id, "content": None}])
+    assert bulk.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    get_resp = await client.get(f"/posts/{post_id}")
+    assert (get_resp.json()["title"], get_resp.json()["content"]) == ("Null", ".")
+
+
+@pytest.mark.asyncio
+async def test_read_post_cache(client: AsyncClient):
+    """Test that repeated post reads are served from the cache."""
+
+    create_resp = await client.post("/posts/", json={"title": "Hot", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    await client.get(f"/posts/{post_id}")
+    await client.get(f"/posts/{post_id}")
+    stats = (await client.get("/diagnostics/cache")).json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_post_cache_invalidation(client: AsyncClient):
+    """Test that writes to a post invalidate its cached reads."""
+
+    create_resp = await client.post("/posts/", json={"title": "Hot", "content": "."})
+    post_id = create_resp.json()["id"]
+    await client.get(f"/posts/{post_id}")
+
+    await client.post(f"/posts/{post_id}/comments", json={"content": "New"})
+    get_resp = await client.get(f"/posts/{post_id}")
+    assert get_resp.json()["comments"][0]["content"] == "New"
+    stats = (await client.get("/diagnostics/cache")).json()
+    assert stats["misses"] == 2
+
+
+@pytest.mark.parametrize(
+    "variable",
+    ["DATABASE_POOL_SIZE", "DATABASE_MAX_OVERFLOW", "DATABASE_POOL_TIMEOUT"],
+)
+def test_negative_pool_settings(monkeypatch: pytest.MonkeyPatch, variable: str):
+    """Test negative pool settings are rejected when settings are read."""
+
+    monkeypatch.setenv(variable, "-1")
+    with pytest.raises(ValueError):
+        DatabaseSettings()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(client: AsyncClient):
+    """Test the connection pool diagnostics endpoint."""
+
+    response = await client.get("/diagnostics/pool")
+    assert response.status_code == status.HTTP_200_OK
+    primary = response.json()["primary"]
+    assert {"checked_out", "overflow", "wait_seconds_max"} <= primary.keys()
+
+
+async def create_commented_post(client: AsyncClient, comments: int) -> int:
+    post_resp = await client.post("/posts/", json={"title": "Busy", "content": "."})
+    post_id = post_resp.json()["id"]
+    payload = [{"content": f"Comment {i}"} for i in range(comments)]
+    await client.post(f"/posts/{post_id}/comments/bulk", json=payload)
+    return post_id
+
+
+@pytest.mark.asyncio
+async def test_comment_pagination(client: AsyncClient):
+    """Test paging through the comments of a post with the cursor."""
+
+    post_id = await create_commented_post(client, 5)
+
+    first = await client.get(f"/posts/{post_id}/comments", params={"limit": 3})
+    assert [c["content"] for c in first.json()] == [f"Comment {i}" for i in range(3)]
+    second = await client.get(
+        f"/posts/{post_id}/comments",
+        params={"limit": 3, "after": first.headers["X-Next-Cursor"]},
+    )
+    assert [c["content"] for c in second.json()] == ["Comment 3", "Comment 4"]
+
+
+@pytest.mark.asyncio
+async def test_comment_preview(client: AsyncClient):
+    """Test a post read embeds only its first comments, with the total count."""
+
+    post_id = await create_commented_post(client, 5)
+
+    preview = await client.get(f"/posts/{post_id}", params={"comments_limit": 2})
+    assert preview.json()["comment_count"] == 5
+    assert [c["content"] for c in preview.json()["comments"]] == [
+        "Comment 0",
+        "Comment 1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_listing_without_comments(client: AsyncClient):
+    """Test listings can leave comments out and still count them."""
+
+    await create_commented_post(client, 5)
+
+    listing = await client.get("/posts/", params={"comments_limit": 0})
+    assert listing.json()[0]["comment_count"] == 5
+    assert listing.json()[0]["comments"] == []
+
+
+@pytest.mark.asyncio
+async def test_comments_of_missing_post(client: AsyncClient):
+    """Test listing the comments of a missing post."""
+
+    missing = await client.get("/posts/9999/comments")
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+SEARCH_POSTS = [
+    {"title": "FastAPI tips", "content": "Routing with FastAPI, FastAPI"},
+    {"title": "SQLAlchemy", "content": "Async sessions and FastAPI"},
+    {"title": "Cooking", "content": "Nothing to see here"},
+    {"title": "FastAPI again", "content": "More on routers"},
+]
+
+
+@pytest.mark.asyncio
+async def test_search_posts(client: AsyncClient):
+    """Test full-text search returns only matching posts, best ranked first."""
+
+    await client.post("/posts/bulk", json=SEARCH_POSTS)
+
+    response = await client.get("/posts/search", params={"q": "fastapi"})
+    assert response.status_code == status.HTTP_200_OK
+    titles = [p["title"] for p in response.json()]
+    assert titles[0] == "FastAPI tips"
+    assert "Cooking" not in titles
+    assert len(titles) == 3
+
+
+@pytest.mark.asyncio
+async def test_search_pagination(client: AsyncClient):
+    """Test paging through search results with the cursor."""
+
+    await client.post("/posts/bulk", json=SEARCH_POSTS)
+
+    response = await client.get("/posts/search", params={"q": "fastapi"})
+    first = await client.get("/posts/search", params={"q": "fastapi", "limit": 2})
+    second = await client.get(
+        "/posts/search",
+        params={"q": "fastapi", "limit": 2, "after": first.headers["X-Next-Cursor"]},
+    )
+    paged = [p["title"] for p in first.json() + second.json()]
+    assert paged == [p["title"] for p in response.json()]
+
+
+@pytest.mark.asyncio
+async def test_search_follows_updates(client: AsyncClient):
+    """Test the search index is updated along with the posts."""
+
+    posts = (await client.post("/posts/bulk", json=SEARCH_POSTS)).json()
+
+    await client.put(
+        "/posts/bulk", json=[{"id": posts[2]["id"], "title": "FastAPI cooking"}]
+    )
+    response = await client.get("/posts/search", params={"q": "cooking fastapi"})
+    assert [p["title"] for p in response.json()] == ["FastAPI cooking"]
+
+
+@pytest.mark.asyncio
+async def test_post_views(client: AsyncClient, session: AsyncSession):
+    """Test that views are buffered and persisted in one flush."""
+
+    create_resp = await client.post("/posts/", json={"title": "Seen", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    for _ in range(3):
+        await client.get(f"/posts/{post_id}")
+
+    view_counter = app.dependency_overrides[get_view_counter]()
+    assert await view_counter.flush(session) == 3
+    assert await view_counter.flush(session) == 0
+
+    response = await client.get(f"/posts/{post_id}", params={"comments_limit": 0})
+    assert response.json()["views"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_view_flush(monkeypatch: pytest.MonkeyPatch):
+    """Test views of a cancelled flush are kept for the next one."""
+
+    async def cancelled(session, views):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(views, "add_post_views", cancelled)
+
+    view_counter = ViewCounter()
+    view_counter.record(1)
+    view_counter.record(1)
+    with pytest.raises(asyncio.CancelledError):
+        await view_counter.flush(None)
+
+    assert view_counter.pending(1) == 2
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_post(client: AsyncClient):
+    """Test a matching If-None-Match gets an empty 304."""
+
+    create_resp = await client.post("/posts/", json={"title": "Etag", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    first = await client.get(f"/posts/{post_id}")
+    assert first.json()["updated_at"] is not None
+
+    not_modified = await client.get(
+        f"/posts/{post_id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_post_last_modified(client: AsyncClient):
+    """Test an If-Modified-Since at Last-Modified gets a 304."""
+
+    create_resp = await client.post("/posts/", json={"title": "Etag", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    first = await client.get(f"/posts/{post_id}")
+    since = await client.get(
+        f"/posts/{post_id}",
+        headers={"If-Modified-Since": first.headers["Last-Modified"]},
+    )
+    assert since.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_modified_post(client: AsyncClient):
+    """Test a new comment changes the ETag of its post."""
+
+    create_resp = await client.post("/posts/", json={"title": "Etag", "content": "."})
+    post_id = create_resp.json()["id"]
+    etag = (await client.get(f"/posts/{post_id}")).headers["ETag"]
+
+    await client.post(f"/posts/{post_id}/comments", json={"content": "Changed"})
+    modified = await client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_listing(client: AsyncClient):
+    """Test listing pages are revalidated with their ETag."""
+
+    await client.post("/posts/", json={"title": "Etag", "content": "."})
+
+    page = await client.get("/posts/")
+    cached_page = await client.get(
+        "/posts/", headers={"If-None-Match": page.headers["ETag"]}
+    )
+    assert cached_page.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_post_unusual_dates(client: AsyncClient):
+    """Test zone-less If-Modified-Since dates are GMT and malformed ones ignored."""
+
+    create_resp = await client.post("/posts/", json={"title": "Dates", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    last_modified = (await client.get(f"/posts/{post_id}")).headers["Last-Modified"]
+
+    for since in (
+        last_modified.replace("GMT", "-0000"),
+        "Fri, 01 Jan 2100 00:00:00",
+    ):
+        response = await client.get(
+            f"/posts/{post_id}", headers={"If-Modified-Since": since}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    for since in ("yesterday", "Fri, 01 Jan 2100 99:00:00 GMT"):
+        response = await client.get(
+            f"/posts/{post_id}", headers={"If-Modified-Since": since}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_fast_post_listing(client: AsyncClient):
+    """Test the fast listing path returns the same documents as the regular one."""
+
+    for i in range(3):
+        post_resp = await client.post(
+            "/posts/", json={"title": f"Fast {i}", "content": "."}
+        )
+        comments = [{"content": f"Comment {j}"} for j in range(i + 1)]
+        await client.post(
+            f"/posts/{post_resp.json()['id']}/comments/bulk", json=comments
+        )
+
+    for path, params in [
+        ("/posts/all", {}),
+        ("/posts/all", {"comments_limit": 1}),
+        ("/posts/", {"limit": 2}),
+        ("/posts/", {"limit": 2, "comments_limit": 0}),
+    ]:
+        regular = await client.get(path, params=params)
+        fast = await client.get(path, params={**params, "fast": True})
+        assert fast.status_code == status.HTTP_200_OK
+        assert fast.json() == regular.json()
+        assert fast.headers.get("ETag") == regular.headers.get("ETag")
+        assert fast.headers.get("X-Next-Cursor") == regular.headers.get("X-Next-Cursor")
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    """Test concurrent calls for one key share a single load."""
+
+    flight = SingleFlight()
+    release = asyncio.Event()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await release.wait()
+        return loads
+
+    calls = [asyncio.create_task(flight.do("key", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == [1] * 5
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_leader():
+    """Test a cancelled leader hands over to the next caller instead of failing it."""
+
+    flight = SingleFlight()
+    release = asyncio.Event()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await release.wait()
+        return loads
+
+    leader = asyncio.create_task(flight.do("key", load))
+    follower = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await follower == 2
+    assert flight.stats()["leaders"] == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesced_post_reads(client: AsyncClient):
+    """Test concurrent reads of one post are served and counted."""
+
+    create_resp = await client.post("/posts/", json={"title": "Viral", "content": "."})
+    post_id = create_resp.json()["id"]
+
+    responses = await asyncio.gather(
+        *(client.get(f"/posts/{post_id}") for _ in range(10))
+    )
+    assert all(r.json()["title"] == "Viral" for r in responses)
+
+    stats = (await client.get("/diagnostics/coalescing")).json()
+    assert stats["in_flight"] == 0
+    assert stats["leaders"] >= 1
+    assert stats["leaders"] + stats["coalesced"] <= 10
+
+
+async def queue_comments(client: AsyncClient, post_id: int, count: int) -> None:
+    for i in range(count):
+        response = await client.post(
+            f"/posts/{post_id}/comments",
+            params={"queue": True},
+            json={"content": f"Queued {i}"},
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json()["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_queued_comments(client: AsyncClient, session: AsyncSession):
+    """Test queued comments are written in batches by the flush."""
+
+    create_resp = await client.post("/posts/", json={"title": "Burst", "content": "."})
+    post_id = create_resp.json()["id"]
+    await client.get(f"/posts/{post_id}")
+    await queue_comments(client, post_id, 5)
+
+    comment_queue = app.dependency_overrides[get_comment_queue]()
+    cache = app.dependency_overrides[get_post_cache]()
+    assert await comment_queue.flush(session, cache) == 2
+    while await comment_queue.flush(session, cache):
+        pass
+
+    post = await client.get(f"/posts/{post_id}")
+    assert [c["content"] for c in post.json()["comments"]] == [
+        f"Queued {i}" for i in range(5)
+    ]
+
+    stats = (await client.get("/diagnostics/comment-queue")).json()
+    assert stats == {
+        "pending": 0,
+        "maxsize": 5,
+        "accepted": 5,
+        "rejected": 0,
+        "flushed": 5,
+        "dropped": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_full_comment_queue(client: AsyncClient):
+    """Test a full comment queue answers 429 with Retry-After."""
+
+    create_resp = await client.post("/posts/", json={"title": "Burst", "content": "."})
+    post_id = create_resp.json()["id"]
+    await queue_comments(client, post_id, 5)
+
+    full = await client.post(
+        f"/posts/{post_id}/comments", params={"queue": True}, json={"content": "."}
+    )
+    assert full.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert full.headers["Retry-After"] == "1"
+    assert (await client.get("/diagnostics/comment-queue")).json()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_comment_on_missing_post(client: AsyncClient):
+    """Test comments on a missing post are not queued."""
+
+    missing = await client.post(
+        "/posts/9999/comments", params={"queue": True}, json={"content": "."}
+    )
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert (await client.get("/diagnostics/comment-queue")).json()["accepted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_comment_batch(monkeypatch: pytest.MonkeyPatch):
+    """Test a batch that keeps failing is dropped after its last attempt."""
+
+    async def failing(session, comments):
+        raise ValueError("Bad row")
+
+    monkeypatch.setattr(comment_queue, "create_queued_comments", failing)
+
+    queue = CommentQueue(maxsize=10, batch_size=2, max_attempts=2)
+    for i in range(3):
+        queue.put(1, CommentCreate(content=f"Queued {i}"))
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await queue.flush(None, None)
+
+    assert queue.stats() == {
+        "pending": 1,
+        "maxsize": 10,
+        "accepted": 3,
+        "rejected": 0,
+        "flushed": 0,
+        "dropped": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_queued_comments_on_deleted_post(session: AsyncSession):
+    """Test comments on a post deleted meanwhile count as dropped, not flushed."""
+
+    queue = CommentQueue()
+    queue.put(9999, CommentCreate(content="Too late"))
+
+    assert await queue.flush(session, TTLCache()) == 1
+    assert queue.stats()["flushed"] == 0
+    assert queue.stats()["dropped"] == 1
+
+
+async def create_tombstone(client: AsyncClient) -> tuple[int, int]:
+    # Returns the ids of a kept post with 1 comment and a deleted one with 5.
+    kept = await client.post("/posts/", json={"title": "Kept tomb", "content": "."})
+    gone = await client.post("/posts/", json={"title": "Gone tomb", "content": "."})
+    kept_id, gone_id = kept.json()["id"], gone.json()["id"]
+    comments = [{"content": f"Comment {i}"} for i in range(5)]
+    await client.post(f"/posts/{gone_id}/comments/bulk", json=comments)
+    await client.post(f"/posts/{kept_id}/comments/bulk", json=comments[:1])
+
+    delete_resp = await client.delete(f"/posts/{gone_id}")
+    assert delete_resp.status_code == status.HTTP_204_NO_CONTENT
+    return kept_id, gone_id
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_post_reads(client: AsyncClient):
+    """Test deleted posts disappear from every read and cannot be deleted again."""
+
+    kept_id, gone_id = await create_tombstone(client)
+
+    again = await client.delete(f"/posts/{gone_id}")
+    assert again.status_code == status.HTTP_404_NOT_FOUND
+    assert (await client.get(f"/posts/{gone_id}")).status_code == 404
+    assert (await client.get(f"/posts/{gone_id}/comments")).status_code == 404
+    for path, params in [
+        ("/posts/all", {}),
+        ("/posts/", {"fast": True}),
+        ("/posts/search", {"q": "tomb"}),
+    ]:
+        response = await client.get(path, params=params)
+        assert [p["id"] for p in response.json()] == [kept_id]
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_post_comments(client: AsyncClient):
+    """Test neither deleted nor missing posts take comments."""
+
+    _, gone_id = await create_tombstone(client)
+
+    comment = {"content": "Late"}
+    for post_id in (gone_id, 0):
+        for path, params, payload in [
+            (f"/posts/{post_id}/comments", {}, comment),
+            (f"/posts/{post_id}/comments", {"queue": True}, comment),
+            (f"/posts/{post_id}/comments/bulk", {}, [comment]),
+        ]:
+            response = await client.post(path, params=params, json=payload)
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_purge_deleted_posts(client: AsyncClient, session: AsyncSession):
+    """Test deleted posts and their comments are purged in batches."""
+
+    await create_tombstone(client)
+
+    # Rows are still there until the purge runs, 5 comments then the post.
+    total = select(func.count(Post.id)).execution_options(include_deleted=True)
+    assert await session.scalar(total) == 2
+
+    purger = PostPurger(batch_size=2)
+    session_maker = async_sessionmaker(session.bind, expire_on_commit=False)
+    assert await purger.purge(session_maker) == 6
+
+    assert await session.scalar(total) == 1
+    assert await session.scalar(select(func.count(Comment.id))) == 1
+
+
+SORTED_POSTS = [
+    {"title": f"Sorted {i}", "content": ".", "publication_date": date}
+    for i, date in enumerate(["2024-01-03", "2024-01-01", "2024-01-02"])
+]
+
+
+@pytest.mark.asyncio
+async def test_sorted_post_listing(client: AsyncClient):
+    """Test listing posts newest first."""
+
+    await client.post("/posts/bulk", json=SORTED_POSTS)
+
+    newest = await client.get("/posts/", params={"sort": "-publication_date"})
+    assert [p["title"] for p in newest.json()] == ["Sorted 0", "Sorted 2", "Sorted 1"]
+
+
+@pytest.mark.asyncio
+async def test_sorted_post_listing_cursor(client: AsyncClient):
+    """Test cursors follow a descending order."""
+
+    await client.post("/posts/bulk", json=SORTED_POSTS)
+
+    first = await client.get("/posts/", params={"sort": "-id", "limit": 2})
+    assert [p["title"] for p in first.json()] == ["Sorted 2", "Sorted 1"]
+    second = await client.get(
+        "/posts/",
+        params={"sort": "-id", "limit": 2, "after": first.headers["X-Next-Cursor"]},
+    )
+    assert [p["title"] for p in second.json()] == ["Sorted 0"]
+
+
+@pytest.mark.asyncio
+async def test_sorted_fast_listing(client: AsyncClient):
+    """Test the fast listing path honours the sort."""
+
+    await client.post("/posts/bulk", json=SORTED_POSTS)
+
+    fast = await client.get(
+        "/posts/all", params={"sort": "publication_date", "fast": True}
+    )
+    assert [p["title"] for p in fast.json()] == ["Sorted 1", "Sorted 2", "Sorted 0"]
+
+
+@pytest.mark.asyncio
+async def test_unsupported_sort(client: AsyncClient):
+    """Test orderings without an index are rejected."""
+
+    unsupported = await client.get("/posts/", params={"sort": "title"})
+    assert unsupported.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_migrate_existing_tables():
+    """Test columns and indexes are added to tables created by older versions."""
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER, "
+                "publication_date DATETIME, content TEXT)"
+            )
+        )
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns, Base.metadata)
+        await conn.run_sync(add_missing_indexes, Base.metadata)
+
+        indexes = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).get_indexes("comments")
+        )
+    await engine.dispose()
+
+    assert [index["column_names"] for index in indexes] == [
+        ["post_id", "publication_date", "id"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_migrate_search_index():
+    """Test posts stored before the upgrade can be searched after it."""
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        # The schema as created before any of these changes.
+        await conn.execute(
+            text(
+                "CREATE TABLE posts (id INTEGER PRIMARY KEY, "
+                "publication_date DATETIME NOT NULL, title VARCHAR(255) NOT NULL, "
+                "content TEXT NOT NULL)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE comments (id INTEGER PRIMARY KEY, "
+                "post_id INTEGER NOT NULL REFERENCES posts (id), "
+                "publication_date DATETIME NOT NULL, content TEXT NOT NULL)"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO posts (publication_date, title, content) "
+                "VALUES ('2024-01-01 00:00:00', 'Old post', 'Written before search')"
+            )
+        )
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns, Base.metadata)
+        await conn.run_sync(add_missing_indexes, Base.metadata)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        existing = await search_posts(session, "written", skip=0, limit=10)
+
+        session.add(Post(title="New post", content="Written after the upgrade"))
+        await session.commit()
+        both = await search_posts(session, "written", skip=0, limit=10)
+    await engine.dispose()
+
+    assert [post.title for post, _ in existing] == ["Old post"]
+    assert sorted(post.title for post, _ in both) == ["New post", "Old post"]
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.internal import database
+from app.models.comment import Comment
+from app.models.post import Post
+from scripts import seed as seed_script
+from scripts.benchmark import RouteResult, Scenario, drive
+
+
+@pytest.fixture(scope="function")
+def seed_engine(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    # The seed disposes of its engine when done, use a file that outlives it.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'seed.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(seed_script, "engine", engine)
+    return engine
+
+
+async def count_rows(engine) -> tuple[int, int]:
+    async with engine.connect() as connection:
+        posts = await connection.scalar(select(func.count(Post.id)))
+        comments = await connection.scalar(select(func.count(Comment.id)))
+    return posts, comments
+
+
+@pytest.mark.asyncio
+async def test_seed(seed_engine):
+    """Test seeding posts in batches, each comment attached to its own post."""
+
+    await seed_script.seed(posts=5, comments_per_post=2, batch_size=2)
+
+    async with seed_engine.connect() as connection:
+        result = await connection.execute(
+            select(Post.title, Comment.content).join(
+                Comment, Comment.post_id == Post.id
+            )
+        )
+        rows = result.all()
+
+    assert len(rows) == 10
+    assert all(content.endswith(title.lower()) for title, content in rows)
+
+
+@pytest.mark.asyncio
+async def test_seed_resumes(seed_engine):
+    """Test seeding again only adds the posts past the last seeded one."""
+
+    await seed_script.seed(posts=3, comments_per_post=1, batch_size=10)
+    await seed_script.seed(posts=5, comments_per_post=1, batch_size=10)
+    assert await count_rows(seed_engine) == (5, 5)
+
+    await seed_script.seed(posts=5, comments_per_post=1, batch_size=10)
+    assert await count_rows(seed_engine) == (5, 5)
+    assert await seed_script.seeded_posts() == 5
+
+
+def test_route_result_summary():
+    """Test the summary of a route reports throughput and latency percentiles."""
+
+    result = RouteResult("get", latencies=[i / 1000 for i in range(1, 101)])
+    result.errors = 2
+    result.elapsed = 2.0
+
+    summary = result.summary()
+    assert summary["requests"] == 100
+    assert summary["errors"] == 2
+    assert summary["throughput"] == 50.0
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.99)
+
+
+def test_route_result_few_latencies():
+    """Test the percentiles of routes with fewer than two requests."""
+
+    assert RouteResult("get").percentile(50) == 0.0
+    assert RouteResult("get", latencies=[0.25]).percentile(99) == 0.25
+    assert RouteResult("get").summary()["throughput"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_drive():
+    """Test the requests are shared by the workers and failures counted."""
+
+    workers = set()
+    calls = itertools.count()
+
+    async def send(worker: int) -> Response:
+        workers.add(worker)
+        await asyncio.sleep(0)
+        call = next(calls)
+        if call == 0:
+            raise ConnectionError("Reset")
+        return Response(500 if call % 10 == 5 else 200)
+
+    result = await drive("get", send, requests=30, concurrency=3)
+
+    assert workers == {0, 1, 2}
+    assert result.errors == 4
+    assert len(result.latencies) == 26
+
+
+@pytest.mark.asyncio
+async def test_scenario_writes(client: AsyncClient):
+    """Test the write routes only touch the posts created by the scenario."""
+
+    scenario = Scenario(client, posts=1, seed=0)
+
+    assert (await scenario.create(0)).status_code == status.HTTP_201_CREATED
+    assert (await scenario.update(0)).json()["title"] == "Updated"
+    assert (await scenario.comment(0)).status_code == status.HTTP_201_CREATED
+    assert (await scenario.delete(0)).status_code == status.HTTP_204_NO_CONTENT
+    assert scenario.created == []
+
+
+@pytest.mark.asyncio
+async def test_scenario_paginate(client: AsyncClient):
+    """Test each worker walks the listing with its own cursor."""
+
+    scenario = Scenario(client, posts=1, seed=0)
+    for _ in range(25):
+        await scenario.create(0)
+
+    first = await scenario.paginate(0)
+    second = await scenario.paginate(0)
+    other = await scenario.paginate(1)
+
+    assert (len(first.json()), len(second.json())) == (20, 5)
+    assert other.json() == first.json()
+    assert scenario.cursors[1] == first.headers["X-Next-Cursor"]
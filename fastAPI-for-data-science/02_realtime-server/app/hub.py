@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Literal
+
+from broadcaster import Broadcast
+from fastapi import WebSocket
+
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SlowConsumerPolicy = Literal["drop_oldest", "disconnect"]
+
+HUB_QUEUE_SIZE = int(os.environ.get("HUB_QUEUE_SIZE", 256))
+HUB_SLOW_CONSUMER: SlowConsumerPolicy = os.environ.get(
+    "HUB_SLOW_CONSUMER", "drop_oldest"
+)
+
+# Messages of a channel arriving within the window are sent as one frame, a
+# JSON array, of at most HUB_BATCH_SIZE messages. 0 sends every message alone.
+HUB_BATCH_WINDOW = float(os.environ.get("HUB_BATCH_WINDOW_MS", 0)) / 1000
+HUB_BATCH_SIZE = int(os.environ.get("HUB_BATCH_SIZE", 100))
+
+# A lost upstream subscription is retried after HUB_RETRY_DELAY seconds,
+# doubling after each failure up to HUB_RETRY_MAX_DELAY.
+HUB_RETRY_DELAY = float(os.environ.get("HUB_RETRY_DELAY", 0.5))
+HUB_RETRY_MAX_DELAY = float(os.environ.get("HUB_RETRY_MAX_DELAY", 30))
+
+# "Try Again Later", sent to sockets disconnected for lagging behind.
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """
+    A local socket with a bounded queue of outgoing messages, drained by its
+    own writer so a slow socket only ever delays itself. When the queue is
+    full, either the oldest message is dropped or the socket is disconnected.
+
+    Incoming messages go through `limiter`, the publisher counts those it
+    refuses in `throttled` and `oversized`.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = HUB_QUEUE_SIZE,
+        policy: SlowConsumerPolicy = HUB_SLOW_CONSUMER,
+    ):
+        self.websocket = websocket
+        self.policy = policy
+        self.limiter = TokenBucket()
+        self.dropped = 0
+        self.overflowed = False
+        self.throttled = 0
+        self.oversized = 0
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize)
+
+    def offer(self, message: str) -> None:
+        if self.overflowed:
+            return
+
+        if self._queue.full():
+            if self.policy == "disconnect":
+                self._disconnect()
+                return
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait(message)
+
+    def _disconnect(self) -> None:
+        # Discard the backlog and have the writer close the socket next.
+        self.overflowed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(None)
+
+    async def run(self) -> None:
+        # Ends quietly when the socket goes away, the endpoint cleans up.
+        with contextlib.suppress(Exception):
+            while (message := await self._queue.get()) is not None:
+                await self.websocket.send_text(message)
+
+            await self.websocket.close(
+                code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer"
+            )
+
+
+class Hub:
+    """
+    In-process fan-out: a single upstream subscription per channel and
+    worker, opened by the first local connection and closed after the last,
+    with each message handed to the connection queues without waiting.
+
+    Frames are built once per message, or per batch of messages, and the
+    same string is queued for every connection. A subscription that fails or
+    ends while the room still has connections is logged and opened again,
+    with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        broadcast: Broadcast,
+        batch_window: float = HUB_BATCH_WINDOW,
+        batch_size: int = HUB_BATCH_SIZE,
+        retry_delay: float = HUB_RETRY_DELAY,
+        retry_max_delay: float = HUB_RETRY_MAX_DELAY,
+    ):
+        self.broadcast = broadcast
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self.resubscribed = 0
+        self.dropped = 0
+        self.disconnected = 0
+        self.throttled = 0
+        self.oversized = 0
+        self._connections: dict[str, set[Connection]] = {}
+        self._listeners: dict[str, asyncio.Task] = {}
+
+    def join(self, channel: str, connection: Connection) -> None:
+        self._connections.setdefault(channel, set()).add(connection)
+        if channel not in self._listeners:
+            self._listeners[channel] = asyncio.create_task(self._listen(channel))
+
+    def leave(self, channel: str, connection: Connection) -> None:
+        self.dropped += connection.dropped
+        self.disconnected += connection.overflowed
+        self.throttled += connection.throttled
+        self.oversized += connection.oversized
+
+        connections = self._connections.get(channel, set())
+        connections.discard(connection)
+        if not connections:
+            self._connections.pop(channel, None)
+            listener = self._listeners.pop(channel, None)
+            if listener is not None:
+                listener.cancel()
+
+    async def _listen(self, channel: str) -> None:
+        delay = self.retry_delay
+        while True:
+            try:
+                async with self.broadcast.subscribe(channel=channel) as subscriber:
+                    delay = self.retry_delay
+                    if not self.batch_window:
+                        async for event in subscriber:
+                            self._fan_out(channel, event.message)
+                    else:
+                        loop = asyncio.get_running_loop()
+                        while True:
+                            batch = [(await subscriber.get()).message]
+                            deadline = loop.time() + self.batch_window
+
+                            while len(batch) < self.batch_size:
+                                try:
+                                    event = await asyncio.wait_for(
+                                        subscriber.get(), deadline - loop.time()
+                                    )
+                                except TimeoutError:
+                                    break
+                                batch.append(event.message)
+
+                            self._fan_out(channel, "[" + ",".join(batch) + "]")
+                logger.warning(f"Subscription to {channel} ended")
+            except Exception:
+                logger.exception(f"Subscription to {channel} failed")
+
+            # The room still has connections, or the listener would have
+            # been cancelled: subscribe again.
+            logger.info(f"Subscribing to {channel} again in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_delay)
+            self.resubscribed += 1
+
+    def _fan_out(self, channel: str, frame: str) -> None:
+        for connection in list(self._connections.get(channel, ())):
+            connection.offer(frame)
+
+    async def close(self) -> None:
+        for listener in self._listeners.values():
+            listener.cancel()
+        for listener in self._listeners.values():
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+
+    def stats(self) -> dict:
+        connections = [c for cs in self._connections.values() for c in cs]
+        return {
+            "channels": len(self._connections),
+            "resubscribed": self.resubscribed,
+            "connections": len(connections),
+            "dropped": self.dropped + sum(c.dropped for c in connections),
+            "disconnected": self.disconnected + sum(c.overflowed for c in connections),
+            "throttled": self.throttled + sum(c.throttled for c in connections),
+            "oversized": self.oversized + sum(c.oversized for c in connections),
+        }
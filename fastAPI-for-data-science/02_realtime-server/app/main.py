@@ -1,19 +1,37 @@
 import asyncio
 import contextlib
+import os
 
 from broadcaster import Broadcast
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Path, WebSocket
 from pydantic import BaseModel
-from starlette.websockets import WebSocketDisconnect
 
-broadcast = Broadcast("redis://localhost:6379")
-CHANNEL = "CHAT"
+from .hub import Connection, Hub
+from .ratelimit import MAX_MESSAGE_SIZE
+
+# redis://... for Redis (or the stand-in in scripts/pubsub_server.py),
+# memory:// for a single process without any broker.
+BROADCAST_URL = os.environ.get("BROADCAST_URL", "redis://localhost:6379")
+
+broadcast = Broadcast(BROADCAST_URL)
+hub = Hub(broadcast)
+DEFAULT_ROOM = "lobby"
+
+# "Unsupported Data", sent to sockets publishing binary frames.
+UNSUPPORTED_DATA_CLOSE_CODE = 1003
+# "Message Too Big", sent to sockets publishing over MAX_MESSAGE_SIZE.
+MESSAGE_TOO_BIG_CLOSE_CODE = 1009
+
+
+def room_channel(room: str) -> str:
+    return f"chat:{room}"
 
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     await broadcast.connect()
     yield
+    await hub.close()
     await broadcast.disconnect()
 
 
@@ -25,37 +43,69 @@ class MessageEvent(BaseModel):
     message: str
 
 
-async def chat_publisher(websocket: WebSocket, username: str):
-    """Listens for messages FROM the browser and publishes TO Redis."""
-    try:
-        while True:
-            data = await websocket.receive_text()
-            event = MessageEvent(username=username, message=data)
-            await broadcast.publish(channel=CHANNEL, message=event.json())
-    except Exception:
-        pass
-
+async def chat_publisher(
+    websocket: WebSocket, connection: Connection, room: str, username: str
+):
+    """
+    Listens for messages FROM the browser and publishes TO the room channel.
+    Messages over the rate limit are dropped, a binary or oversized one closes
+    the socket.
+    """
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        data = message.get("text")
+        if data is None:
+            await websocket.close(
+                code=UNSUPPORTED_DATA_CLOSE_CODE, reason="Text frames only"
+            )
+            return
+        if len(data.encode()) > MAX_MESSAGE_SIZE:
+            connection.oversized += 1
+            await websocket.close(
+                code=MESSAGE_TOO_BIG_CLOSE_CODE, reason="Message too big"
+            )
+            return
+        if not connection.limiter.take():
+            connection.throttled += 1
+            continue
 
-async def chat_subscriber(websocket: WebSocket):
-    """Listens for messages FROM Redis and sends TO the browser."""
-    async with broadcast.subscribe(channel=CHANNEL) as subscriber:
-        async for event in subscriber:
-            await websocket.send_text(event.message)
+        event = MessageEvent(username=username, message=data)
+        await broadcast.publish(
+            channel=room_channel(room), message=event.model_dump_json()
+        )
 
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, username: str = "Anonymous"):
+@app.websocket("/ws/{room}")
+async def room_endpoint(
+    websocket: WebSocket,
+    room: str = Path(pattern=r"^[\w-]{1,64}$"),
+    username: str = "Anonymous",
+):
     await websocket.accept()
-    publisher_task = asyncio.create_task(chat_publisher(websocket, username))
-    subscriber_task = asyncio.create_task(chat_subscriber(websocket))
+    connection = Connection(websocket)
+    hub.join(room_channel(room), connection)
 
+    publisher_task = asyncio.create_task(
+        chat_publisher(websocket, connection, room, username)
+    )
+    writer_task = asyncio.create_task(connection.run())
     try:
         await asyncio.wait(
-            [publisher_task, subscriber_task],
-            return_when=asyncio.FIRST_COMPLETED
+            [publisher_task, writer_task], return_when=asyncio.FIRST_COMPLETED
         )
-    except Exception:
-        pass
     finally:
         publisher_task.cancel()
-        subscriber_task.cancel()
\ No newline at end of file
+        writer_task.cancel()
+        hub.leave(room_channel(room), connection)
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, username: str = "Anonymous"):
+    await room_endpoint(websocket, DEFAULT_ROOM, username)
+
+
+@app.get("/stats")
+async def stats():
+    return hub.stats()
@@ -0,0 +1,36 @@
+import os
+import time
+
+# Messages a socket may publish per second, with bursts of up to
+# PUBLISH_BURST messages. 0 disables the limit.
+PUBLISH_RATE = float(os.environ.get("PUBLISH_RATE", 5))
+PUBLISH_BURST = int(os.environ.get("PUBLISH_BURST", 10))
+
+# Largest message a socket may publish, in bytes of UTF-8.
+MAX_MESSAGE_SIZE = int(os.environ.get("MAX_MESSAGE_SIZE", 4096))
+
+
+class TokenBucket:
+    """
+    Holds up to `burst` tokens, refilled at `rate` tokens per second. Each
+    message takes one token, messages finding the bucket empty are refused.
+    """
+
+    def __init__(self, rate: float = PUBLISH_RATE, burst: int = PUBLISH_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        if not self.rate:
+            return True
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
@@ -19,7 +19,10 @@ const addMessage = (message, senderName) => {
 window.addEventListener('DOMContentLoaded', () => {
   currentUsername = prompt("Enter your username:") || "Anonymous";
 
-  const socket = new WebSocket(`ws://localhost:8000/ws?username=${currentUsername}`);
+  const room = window.location.hash.slice(1) || "lobby";
+  const socket = new WebSocket(
+    `ws://localhost:8000/ws/${encodeURIComponent(room)}?username=${encodeURIComponent(currentUsername)}`
+  );
 
   socket.addEventListener('open', () => {
     console.log('Connected to Server');
@@ -37,8 +40,11 @@ window.addEventListener('DOMContentLoaded', () => {
 
   socket.addEventListener('message', (event) => {
     try {
+      // Batched frames carry an array of messages.
       const data = JSON.parse(event.data);
-      addMessage(data.message, data.username);
+      for (const item of Array.isArray(data) ? data : [data]) {
+        addMessage(item.message, item.username);
+      }
     } catch (e) {
       console.error("Error parsing message:", e);
     }
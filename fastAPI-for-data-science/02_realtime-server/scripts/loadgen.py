@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from websockets.asyncio.client import ClientConnection, connect
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.expected = 0
+        self.received = 0
+        self.latencies: list[float] = []
+
+    def percentile(self, p: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100)[p - 1]
+
+
+async def receive(socket: ClientConnection, stats: Stats) -> None:
+    async for frame in socket:
+        now = time.perf_counter()
+        data = json.loads(frame)
+        # Batched frames carry an array of messages.
+        for event in data if isinstance(data, list) else [data]:
+            sent = json.loads(event["message"])["sent"]
+            stats.received += 1
+            stats.latencies.append(now - sent)
+
+
+async def publish(
+    socket: ClientConnection,
+    stats: Stats,
+    messages: int,
+    rate: float,
+    receivers: int,
+) -> None:
+    for id in range(messages):
+        await socket.send(json.dumps({"id": id, "sent": time.perf_counter()}))
+        stats.sent += 1
+        stats.expected += receivers
+        await asyncio.sleep(1 / rate)
+
+
+async def run(args: argparse.Namespace) -> Stats:
+    stats = Stats()
+    urls = args.url or ["ws://localhost:8000"]
+    limit = asyncio.Semaphore(args.connect_concurrency)
+
+    async def open_socket(index: int) -> ClientConnection:
+        # Spread each room over the workers so messages cross the broker.
+        room = f"load-{index % args.rooms}"
+        url = urls[index // args.rooms % len(urls)]
+        async with limit:
+            return await connect(
+                f"{url}/ws/{room}?username=load-{index}",
+                compression="deflate" if args.deflate else None,
+                max_queue=None,
+            )
+
+    started = time.perf_counter()
+    sockets = await asyncio.gather(*(open_socket(i) for i in range(args.connections)))
+    logger.info(
+        f"Opened {len(sockets)} connections in {args.rooms} rooms "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    receivers = [asyncio.create_task(receive(socket, stats)) for socket in sockets]
+    await asyncio.sleep(args.warmup)
+
+    # The first socket of each room publishes, every socket of the room
+    # (the publisher included) should receive each message.
+    room_sizes = [len(sockets[room :: args.rooms]) for room in range(args.rooms)]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            publish(sockets[room], stats, args.messages, args.rate, room_sizes[room])
+            for room in range(min(args.rooms, len(sockets)))
+        )
+    )
+
+    # Let in-flight messages arrive.
+    deadline = time.perf_counter() + args.drain
+    while stats.received < stats.expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+
+    for task in receivers:
+        task.cancel()
+    await asyncio.gather(*(socket.close() for socket in sockets))
+
+    logger.info(f"sent:      {stats.sent} messages")
+    logger.info(
+        f"delivered: {stats.received} of {stats.expected} "
+        f"({stats.received / max(stats.expected, 1):.1%}), "
+        f"{stats.received / elapsed:,.0f} deliveries/sec"
+    )
+    logger.info(
+        f"latency:   p50 {stats.percentile(50) * 1000:.1f} ms, "
+        f"p95 {stats.percentile(95) * 1000:.1f} ms, "
+        f"p99 {stats.percentile(99) * 1000:.1f} ms"
+    )
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Open many chat connections and measure delivery and latency."
+    )
+    parser.add_argument(
+        "--url", action="append", help="Repeat to spread connections over workers"
+    )
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=100, help="Per room")
+    parser.add_argument("--rate", type=float, default=5, help="Messages/sec per room")
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--drain", type=float, default=5.0)
+    parser.add_argument("--deflate", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
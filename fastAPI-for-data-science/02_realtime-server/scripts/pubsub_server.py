@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import logging
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def bulk(value: bytes | None) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def integer(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+def array(*items: bytes) -> bytes:
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+def push(protocol: int, *items: bytes) -> bytes:
+    # RESP3 sends pub/sub messages as out-of-band pushes, RESP2 as arrays.
+    if protocol == 3:
+        return b">%d\r\n" % len(items) + b"".join(items)
+    return array(*items)
+
+
+def hello(protocol: int) -> bytes:
+    fields = [
+        (b"server", bulk(b"pubsub-stand-in")),
+        (b"version", bulk(b"7.0.0")),
+        (b"proto", integer(protocol)),
+        (b"mode", bulk(b"standalone")),
+        (b"role", bulk(b"master")),
+    ]
+    items = b"".join(bulk(key) + value for key, value in fields)
+    if protocol == 3:
+        return b"%%%d\r\n" % len(fields) + items
+    return b"*%d\r\n" % (len(fields) * 2) + items
+
+
+class PubSubServer:
+    """
+    A stand-in for Redis pub/sub implementing just enough for redis-py:
+    SUBSCRIBE, UNSUBSCRIBE, PUBLISH, PING and the connection handshake, over
+    RESP2 or RESP3 as negotiated with HELLO.
+    Lets several app workers share channels locally without a Redis server.
+    """
+
+    def __init__(self):
+        # Subscribers of each channel, with the protocol they speak.
+        self.channels: dict[bytes, dict[asyncio.StreamWriter, int]] = {}
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        subscriptions: set[bytes] = set()
+        protocol = 2
+        try:
+            while (command := await self.read_command(reader)) is not None:
+                if not command:
+                    continue
+                name, args = command[0].upper(), command[1:]
+
+                if name == b"HELLO":
+                    requested = args[0] if args else b"%d" % protocol
+                    if requested in (b"2", b"3"):
+                        protocol = int(requested)
+                        writer.write(hello(protocol))
+                    else:
+                        writer.write(b"-NOPROTO unsupported protocol version\r\n")
+                elif name == b"SUBSCRIBE":
+                    for channel in args:
+                        subscriptions.add(channel)
+                        self.channels.setdefault(channel, {})[writer] = protocol
+                        writer.write(
+                            push(
+                                protocol,
+                                bulk(b"subscribe"),
+                                bulk(channel),
+                                integer(len(subscriptions)),
+                            )
+                        )
+                elif name == b"UNSUBSCRIBE":
+                    for channel in args or sorted(subscriptions) or [None]:
+                        self._unsubscribe(channel, writer, subscriptions)
+                        writer.write(
+                            push(
+                                protocol,
+                                bulk(b"unsubscribe"),
+                                bulk(channel),
+                                integer(len(subscriptions)),
+                            )
+                        )
+                elif name == b"PUBLISH" and len(args) != 2:
+                    writer.write(
+                        b"-ERR wrong number of arguments for 'publish' command\r\n"
+                    )
+                elif name == b"PUBLISH":
+                    channel, message = args
+                    subscribers = self.channels.get(channel, {})
+                    items = (bulk(b"message"), bulk(channel), bulk(message))
+                    frames = {2: push(2, *items), 3: push(3, *items)}
+                    for subscriber, subscriber_protocol in subscribers.items():
+                        subscriber.write(frames[subscriber_protocol])
+                    writer.write(integer(len(subscribers)))
+                elif name == b"PING":
+                    if subscriptions and protocol == 2:
+                        writer.write(array(bulk(b"pong"), bulk(b"")))
+                    else:
+                        writer.write(b"+PONG\r\n")
+                elif name in (b"CLIENT", b"SELECT"):
+                    writer.write(b"+OK\r\n")
+                elif name == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % name)
+
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in list(subscriptions):
+                self._unsubscribe(channel, writer, subscriptions)
+            writer.close()
+
+    def _unsubscribe(
+        self,
+        channel: bytes | None,
+        writer: asyncio.StreamWriter,
+        subscriptions: set[bytes],
+    ) -> None:
+        if channel is None:
+            return
+        subscriptions.discard(channel)
+        subscribers = self.channels.get(channel, {})
+        subscribers.pop(writer, None)
+        if not subscribers:
+            self.channels.pop(channel, None)
+
+    @staticmethod
+    async def read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+
+        # Inline commands, as typed in telnet.
+        if not line.startswith(b"*"):
+            return line.split()
+
+        command = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            command.append((await reader.readexactly(length + 2))[:-2])
+        return command
+
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(PubSubServer().handle, host, port)
+    logger.info(f"Pub/sub stand-in listening on redis://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a local stand-in for Redis pub/sub."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+from broadcaster import Broadcast
+from fastapi.testclient import TestClient
+
+# The app picks its broker on import, tests run without Redis.
+os.environ["BROADCAST_URL"] = "memory://"
+
+from app import main  # noqa: E402
+from app.hub import Hub  # noqa: E402
+
+
+@pytest.fixture(scope="function")
+def hub(monkeypatch: pytest.MonkeyPatch) -> Hub:
+    # A fresh broker and hub per test, each TestClient runs its own loop.
+    broadcast = Broadcast("memory://")
+    hub = Hub(broadcast)
+    monkeypatch.setattr(main, "broadcast", broadcast)
+    monkeypatch.setattr(main, "hub", hub)
+    return hub
+
+
+@pytest.fixture(scope="function")
+def client(hub: Hub):
+    with TestClient(main.app) as client:
+        yield client
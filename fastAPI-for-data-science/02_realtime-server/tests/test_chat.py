@@ -0,0 +1,260 @@
+import asyncio
+import contextlib
+import functools
+import json
+
+import pytest
+from broadcaster import Broadcast
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import hub as hub_module
+from app import ratelimit
+from app.hub import SLOW_CONSUMER_CLOSE_CODE, Connection, Hub
+from app.main import MESSAGE_TOO_BIG_CLOSE_CODE, UNSUPPORTED_DATA_CLOSE_CODE
+from app.ratelimit import MAX_MESSAGE_SIZE, TokenBucket
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent: list[str] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.close_code = code
+
+
+def test_room_isolation(client: TestClient):
+    """Test messages only reach the sockets of their room."""
+
+    with (
+        client.websocket_connect("/ws/data?username=ada") as first,
+        client.websocket_connect("/ws/data?username=bob") as second,
+        client.websocket_connect("/ws/other?username=eve") as other,
+    ):
+        first.send_text("hello data")
+        assert first.receive_json() == {"username": "ada", "message": "hello data"}
+        assert second.receive_json() == {"username": "ada", "message": "hello data"}
+
+        # The first message of the other room is its own.
+        other.send_text("hello other")
+        assert other.receive_json() == {"username": "eve", "message": "hello other"}
+
+
+def test_default_username(client: TestClient):
+    """Test sockets without a username post as Anonymous."""
+
+    with client.websocket_connect("/ws/data") as ws:
+        ws.send_text("hi")
+        assert ws.receive_json() == {"username": "Anonymous", "message": "hi"}
+
+
+def test_invalid_room_name(client: TestClient):
+    """Test room names outside the allowed pattern are refused."""
+
+    with pytest.raises(WebSocketDisconnect) as disconnect:
+        with client.websocket_connect("/ws/not%20a%20room"):
+            pass
+
+    assert disconnect.value.code == status.WS_1008_POLICY_VIOLATION
+
+
+def test_lobby(client: TestClient):
+    """Test /ws is the lobby room."""
+
+    with (
+        client.websocket_connect("/ws") as bare,
+        client.websocket_connect("/ws/lobby") as lobby,
+    ):
+        bare.send_text("hi")
+        assert lobby.receive_json()["message"] == "hi"
+
+
+def test_batched_frames(client: TestClient, hub: Hub):
+    """Test messages within the batch window share one JSON array frame."""
+
+    hub.batch_window = 0.2
+
+    with client.websocket_connect("/ws/batch?username=ada") as ws:
+        for i in range(3):
+            ws.send_text(f"m{i}")
+        frame = ws.receive_json()
+
+    assert frame == [{"username": "ada", "message": f"m{i}"} for i in range(3)]
+
+
+def test_one_channel_per_room(client: TestClient):
+    """Test a worker holds one upstream channel per room, whatever its sockets."""
+
+    with (
+        client.websocket_connect("/ws/data?username=ada"),
+        client.websocket_connect("/ws/data?username=bob"),
+        client.websocket_connect("/ws/other?username=eve"),
+    ):
+        stats = client.get("/stats").json()
+
+    assert (stats["channels"], stats["connections"]) == (2, 3)
+
+
+async def test_drop_oldest_policy():
+    """Test a full queue drops its oldest message and keeps the socket."""
+
+    websocket = FakeWebSocket()
+    connection = Connection(websocket, maxsize=2, policy="drop_oldest")
+    for i in range(4):
+        connection.offer(f"m{i}")
+    assert connection.dropped == 2
+    assert not connection.overflowed
+
+    writer = asyncio.create_task(connection.run())
+    await asyncio.sleep(0.01)
+    writer.cancel()
+
+    assert websocket.sent == ["m2", "m3"]
+    assert websocket.close_code is None
+
+
+async def test_disconnect_policy():
+    """Test a full queue disconnects the socket with 1013."""
+
+    websocket = FakeWebSocket()
+    connection = Connection(websocket, maxsize=2, policy="disconnect")
+    for i in range(4):
+        connection.offer(f"m{i}")
+    assert connection.overflowed
+    assert connection.dropped == 2
+
+    await asyncio.wait_for(connection.run(), 1)
+
+    assert websocket.sent == []
+    assert websocket.close_code == SLOW_CONSUMER_CLOSE_CODE
+
+
+def test_token_bucket_burst(monkeypatch: pytest.MonkeyPatch):
+    """Test the bucket allows a burst, then refuses until it refills."""
+
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: 1000.0)
+
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_refill(monkeypatch: pytest.MonkeyPatch):
+    """Test the bucket refills at its rate."""
+
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.take()
+
+    now[0] += 0.5
+    assert [bucket.take() for _ in range(2)] == [True, False]
+
+
+def test_token_bucket_refill_cap(monkeypatch: pytest.MonkeyPatch):
+    """Test a long idle bucket refills up to the burst only."""
+
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+
+    bucket = TokenBucket(rate=2, burst=3)
+    bucket.take()
+
+    now[0] += 60
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_unlimited():
+    """Test a rate of 0 disables the limit."""
+
+    unlimited = TokenBucket(rate=0, burst=1)
+    assert all(unlimited.take() for _ in range(100))
+
+
+def test_throttled_messages(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    """Test messages over the rate limit are dropped and counted."""
+
+    monkeypatch.setattr(
+        hub_module, "TokenBucket", functools.partial(TokenBucket, rate=1e-3, burst=2)
+    )
+
+    with client.websocket_connect("/ws/limited") as ws:
+        for i in range(5):
+            ws.send_text(f"m{i}")
+        received = [ws.receive_json()["message"] for _ in range(2)]
+
+    assert received == ["m0", "m1"]
+    assert client.get("/stats").json()["throttled"] == 3
+
+
+def test_message_at_size_limit(client: TestClient):
+    """Test a message of exactly the size limit is published."""
+
+    with client.websocket_connect("/ws/big") as ws:
+        ws.send_text("x" * MAX_MESSAGE_SIZE)
+        assert len(ws.receive_json()["message"]) == MAX_MESSAGE_SIZE
+
+
+def test_oversized_message(client: TestClient):
+    """Test a message over the size limit closes the socket with 1009."""
+
+    with client.websocket_connect("/ws/big") as ws:
+        ws.send_text("x" * (MAX_MESSAGE_SIZE + 1))
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            ws.receive_text()
+
+    assert disconnect.value.code == MESSAGE_TOO_BIG_CLOSE_CODE
+    assert client.get("/stats").json()["oversized"] == 1
+
+
+def test_binary_message(client: TestClient):
+    """Test a binary frame closes the socket with 1003."""
+
+    with client.websocket_connect("/ws/binary") as ws:
+        ws.send_bytes(json.dumps({"message": "hi"}).encode())
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            ws.receive_text()
+
+    assert disconnect.value.code == UNSUPPORTED_DATA_CLOSE_CODE
+
+
+async def test_resubscribe_after_failure():
+    """Test a room subscription that fails is opened again."""
+
+    class FlakyBroadcast(Broadcast):
+        failures = 2
+
+        @contextlib.asynccontextmanager
+        async def subscribe(self, channel: str):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("Broker down")
+            async with super().subscribe(channel) as subscriber:
+                yield subscriber
+
+    broadcast = FlakyBroadcast("memory://")
+    await broadcast.connect()
+    hub = Hub(broadcast, retry_delay=0.01)
+
+    websocket = FakeWebSocket()
+    connection = Connection(websocket)
+    writer = asyncio.create_task(connection.run())
+    hub.join("chat:flaky", connection)
+
+    await asyncio.sleep(0.1)
+    await broadcast.publish("chat:flaky", "back")
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == ["back"]
+    assert hub.stats()["resubscribed"] == 2
+
+    hub.leave("chat:flaky", connection)
+    writer.cancel()
+    await hub.close()
+    await broadcast.disconnect()
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from broadcaster import Broadcast
+
+from app.hub import Connection, Hub
+from scripts.pubsub_server import PubSubServer
+
+from .test_chat import FakeWebSocket
+
+
+@pytest.fixture(scope="function")
+async def pubsub():
+    server = PubSubServer()
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        yield server, port
+
+
+async def wait_for(condition, timeout: float = 2) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_two_workers(pubsub):
+    """Test every worker of a room receives the messages published by any."""
+
+    server, port = pubsub
+    url = f"redis://127.0.0.1:{port}"
+    workers = [Broadcast(url), Broadcast(url)]
+    for broadcast in workers:
+        await broadcast.connect()
+    hubs = [Hub(broadcast) for broadcast in workers]
+
+    sockets = [FakeWebSocket(), FakeWebSocket()]
+    connections = [Connection(websocket) for websocket in sockets]
+    writers = [asyncio.create_task(connection.run()) for connection in connections]
+    for hub, connection in zip(hubs, connections):
+        hub.join("chat:shared", connection)
+    await wait_for(lambda: len(server.channels.get(b"chat:shared", {})) == 2)
+
+    for i, broadcast in enumerate(workers):
+        for j in range(5):
+            await broadcast.publish("chat:shared", f"w{i}-m{j}")
+    await wait_for(lambda: all(len(websocket.sent) == 10 for websocket in sockets))
+
+    expected = [f"w{i}-m{j}" for i in range(2) for j in range(5)]
+    assert [sorted(websocket.sent) for websocket in sockets] == [expected, expected]
+
+    for hub, connection in zip(hubs, connections):
+        hub.leave("chat:shared", connection)
+        await hub.close()
+    for writer in writers:
+        writer.cancel()
+    for broadcast in workers:
+        await broadcast.disconnect()
+
+
+async def test_broadcast_url(pubsub):
+    """Test the app publishes through the broker named by BROADCAST_URL."""
+
+    server, port = pubsub
+    url = f"redis://127.0.0.1:{port}"
+    script = (
+        "import asyncio\n"
+        "from app.main import broadcast\n"
+        "async def publish():\n"
+        "    async with broadcast:\n"
+        "        await broadcast.publish('chat:env', 'hi')\n"
+        "asyncio.run(publish())\n"
+    )
+    async with Broadcast(url) as listener:
+        async with listener.subscribe("chat:env") as subscriber:
+            await wait_for(lambda: b"chat:env" in server.channels)
+
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-c",
+                script,
+                cwd=Path(__file__).parent.parent,
+                env=os.environ | {"BROADCAST_URL": url},
+            )
+            assert await process.wait() == 0
+
+            event = await asyncio.wait_for(subscriber.get(), 2)
+    assert event.message == "hi"
+
+
+async def test_pubsub_server_protocols(pubsub):
+    """Test the stand-in delivers to RESP2 and RESP3 subscribers alike."""
+
+    _, port = pubsub
+    (reader2, writer2), (reader3, writer3), (_, publisher) = [
+        await asyncio.open_connection("127.0.0.1", port) for _ in range(3)
+    ]
+
+    writer3.write(b"HELLO 3\r\n")
+    assert (await reader3.readline()).startswith(b"%5")
+    await reader3.readuntil(b"standalone\r\n$4\r\nrole\r\n$6\r\nmaster\r\n")
+
+    for reader, writer in ((reader2, writer2), (reader3, writer3)):
+        writer.write(b"SUBSCRIBE chat:resp\r\n")
+        await reader.readuntil(b":1\r\n")
+
+    publisher.write(b"PUBLISH chat:resp hi\r\n")
+    frame = b"3\r\n$7\r\nmessage\r\n$9\r\nchat:resp\r\n$2\r\nhi\r\n"
+    assert await reader2.readexactly(len(frame) + 1) == b"*" + frame
+    assert await reader3.readexactly(len(frame) + 1) == b">" + frame
+
+    for writer in (writer2, writer3, publisher):
+        writer.close()
+
+
+async def test_pubsub_server_wrong_arguments(pubsub):
+    """Test a malformed PUBLISH gets an error and keeps the connection."""
+
+    _, port = pubsub
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    writer.write(b"PUBLISH chat:only\r\n")
+    assert await reader.readline() == (
+        b"-ERR wrong number of arguments for 'publish' command\r\n"
+    )
+    writer.write(b"HELLO x\r\n")
+    assert (await reader.readline()).startswith(b"-NOPROTO")
+    writer.write(b"PING\r\n")
+    assert await reader.readline() == b"+PONG\r\n"
+
+    writer.close()